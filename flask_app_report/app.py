@@ -1,20 +1,42 @@
+import calendar
+import json
 import os
 import re
-from flask import Flask, request, render_template, redirect, url_for, flash
+import subprocess
+import socket
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import click
+from flask import Flask, Request, request, render_template, redirect, url_for, flash, jsonify, abort
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import mysql.connector
-from pdf2image import convert_from_path
+from mysql.connector import pooling
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
-from pytesseract import Output
+from PIL import Image
 import hashlib
-from datetime import datetime
+from datetime import date, datetime
 import unidecode
+from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST,
+                               generate_latest, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
 
 # Criação da aplicação Flask
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = '/app/uploads'  # Diretório onde os arquivos serão armazenados
+app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', '/app/uploads')  # Diretório onde os arquivos serão armazenados
 app.config['ALLOWED_EXTENSIONS'] = {'pdf'}  # Extensões permitidas para upload
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'your_default_secret_key')  # Chave secreta da aplicação Flask
+# Tamanho máximo de uma requisição de upload; o Werkzeug recusa (413) antes de ler o corpo quando o Content-Length passa do limite
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', 50)) * 1024 * 1024
+# Número máximo de páginas por PDF enviado (0 = sem limite)
+MAX_UPLOAD_PAGES = int(os.environ.get('MAX_UPLOAD_PAGES', 500))
 
 # Garantir que o diretório de uploads exista
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -27,103 +49,593 @@ db_config = {
     'database': os.environ.get('MYSQL_DATABASE', 'atestados')
 }
 
+# Configurações do pool de conexões (MYSQL_POOL_SIZE=0 desativa o pool e abre uma conexão por uso)
+MYSQL_POOL_SIZE = int(os.environ.get('MYSQL_POOL_SIZE', 5))  # Máximo de 32 conexões por pool (limite do mysql-connector)
+MYSQL_POOL_TIMEOUT = float(os.environ.get('MYSQL_POOL_TIMEOUT', 10))  # Tempo máximo (s) de espera por uma conexão livre
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Função para obter uma conexão do pool compartilhado; connection.close() devolve a conexão ao pool
+def get_connection():
+    global _pool
+    if MYSQL_POOL_SIZE <= 0:
+        return mysql.connector.connect(**db_config)
+
+    # O pool é criado no primeiro uso, já dentro do processo que vai utilizá-lo (seguro com fork)
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(pool_name='atestados', pool_size=MYSQL_POOL_SIZE, **db_config)
+
+    # get_connection() falha imediatamente quando o pool está esgotado, então aguardamos uma conexão livre
+    deadline = time.monotonic() + MYSQL_POOL_TIMEOUT
+    while True:
+        try:
+            return _pool.get_connection()
+        except pooling.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+# Número de processos usados para o OCR das páginas (padrão: número de CPUs do pod)
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+# Número de páginas rasterizadas por vez em cada processo (limita o uso de memória e de disco temporário)
+OCR_PAGE_CHUNK = max(1, int(os.environ.get('OCR_PAGE_CHUNK', 4)))
+# Aproveita a camada de texto embutida nos PDFs digitais em vez de fazer OCR (PDF_TEXT_LAYER=0 desativa)
+PDF_TEXT_LAYER = os.environ.get('PDF_TEXT_LAYER', '1') != '0'
+# Mínimo de letras/dígitos para considerar que a camada de texto de uma página é utilizável
+PDF_TEXT_MIN_CHARS = int(os.environ.get('PDF_TEXT_MIN_CHARS', 30))
+
+# Perfis de OCR: resolução da rasterização, tons de cinza, binarização (limiar 0-255, 0 = desligada),
+# modo de segmentação (--psm) e motor (--oem) do tesseract, idioma e recorte opcional da página
+# (left, top, right, bottom em frações da página). Com recorte, só o trecho recortado é gravado e indexado.
+OCR_PROFILES = {
+    # Configuração anterior: 200 DPI colorido e o modelo padrão (inglês) do tesseract
+    'legacy': {'dpi': 200, 'grayscale': False, 'binarize': 0, 'psm': 3, 'oem': 3, 'lang': 'eng', 'crop': None},
+    'default': {'dpi': 200, 'grayscale': True, 'binarize': 0, 'psm': 3, 'oem': 3, 'lang': 'por', 'crop': None},
+    'fast': {'dpi': 150, 'grayscale': True, 'binarize': 160, 'psm': 6, 'oem': 1, 'lang': 'por', 'crop': None},
+    # Apenas a metade superior das páginas, onde costumam estar "Data de início" e "Conclusão Efetiva"
+    'dates': {'dpi': 200, 'grayscale': True, 'binarize': 0, 'psm': 3, 'oem': 3, 'lang': 'por', 'crop': (0.0, 0.0, 1.0, 0.5)},
+}
+
+# Função para montar o perfil de OCR em uso: OCR_PROFILE escolhe o perfil e as variáveis OCR_* sobrescrevem cada opção
+def load_ocr_profile():
+    name = os.environ.get('OCR_PROFILE', 'default')
+    if name not in OCR_PROFILES:
+        raise ValueError(f"OCR_PROFILE inválido: {name!r} (perfis disponíveis: {', '.join(OCR_PROFILES)})")
+    profile = dict(OCR_PROFILES[name])
+    overrides = {
+        'dpi': ('OCR_DPI', int),
+        'grayscale': ('OCR_GRAYSCALE', lambda value: value != '0'),
+        'binarize': ('OCR_BINARIZE', int),
+        'psm': ('OCR_PSM', int),
+        'oem': ('OCR_OEM', int),
+        'lang': ('OCR_LANG', str),
+        'crop': ('OCR_CROP', lambda value: tuple(float(part) for part in value.split(',')) if value else None),  # Ex: 0,0,1,0.5
+    }
+    for key, (variable, parse) in overrides.items():
+        if variable in os.environ:
+            profile[key] = parse(os.environ[variable])
+    return profile
+
+OCR_PROFILE = load_ocr_profile()
+
+# Configurações da fila de processamento dos uploads
+INGEST_WORKER_THREADS = int(os.environ.get('INGEST_WORKER_THREADS', 1))  # Threads de OCR iniciadas junto com a aplicação
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))  # Intervalo (s) entre consultas à fila quando está vazia
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 3600))  # Jobs em processamento há mais tempo que isso voltam para a fila
+
+# Tamanho máximo (MB) do cache de OCR indexado pelo hash do arquivo; 0 desativa o cache
+OCR_CACHE_MAX_MB = int(os.environ.get('OCR_CACHE_MAX_MB', 256))
+
+# Tamanho padrão e máximo das páginas de resultados da busca por datas
+SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', 50))
+SEARCH_MAX_PAGE_SIZE = 500
+# Até quantos documentos com d2 >= início a busca por datas lê pelo índice (d2, d1) e ordena em memória
+SEARCH_D2_SCAN_LIMIT = int(os.environ.get('SEARCH_D2_SCAN_LIMIT', 5000))
+
+# Cache (LRU com validade) dos resultados da busca por datas, por processo; SEARCH_CACHE_SIZE=0 desativa
+SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE', 512))  # Número máximo de páginas de resultados guardadas
+SEARCH_CACHE_TTL = float(os.environ.get('SEARCH_CACHE_TTL', 300))  # Validade (s) de cada entrada
+# Intervalo (s) entre as verificações de documentos gravados por outros processos (worker.py, outras réplicas)
+SEARCH_CACHE_SYNC_INTERVAL = float(os.environ.get('SEARCH_CACHE_SYNC_INTERVAL', 2))
+
+# Configurações da busca textual
+TEXT_SEARCH_LIMIT = int(os.environ.get('TEXT_SEARCH_LIMIT', 20))  # Número padrão de resultados
+TEXT_SEARCH_MAX_LIMIT = 100
+SNIPPET_LENGTH = 240  # Tamanho (caracteres) do trecho retornado em volta do primeiro termo
+
+# API JSON: validade (s) das respostas da busca no cache do cliente (0 = o cliente revalida sempre pelo ETag)
+API_SEARCH_MAX_AGE = int(os.environ.get('API_SEARCH_MAX_AGE', 0))
+API_JOBS_MAX_IDS = 100  # Máximo de jobs consultados por requisição em /api/jobs
+
+# Nível de compressão zlib do texto extraído (1 = mais rápido, 9 = menor)
+TEXT_COMPRESSION_LEVEL = int(os.environ.get('TEXT_COMPRESSION_LEVEL', 6))
+
+# Configurações da listagem de arquivos enviados
+FILES_PAGE_SIZE = int(os.environ.get('FILES_PAGE_SIZE', 100))  # Arquivos por página da listagem
+FILES_MAX_PAGE_SIZE = 1000
+FILES_COUNT_TTL = float(os.environ.get('FILES_COUNT_TTL', 60))  # Validade (s) do total de arquivos em cache
+
+# Total de arquivos enviados em cache (COUNT(*) no InnoDB percorre a tabela inteira)
+_files_count_cache = {'value': None, 'expires': 0.0}
+
+# Entradas do cache da busca por datas: chave (início, fim, cursor, tamanho da página) -> (expira em, resultados, cursor)
+_search_cache = OrderedDict()
+_search_cache_lock = threading.Lock()
+# Maior id de pdf_text já considerado nas invalidações; generation muda a cada documento gravado, para que uma
+# busca que começou antes da gravação não guarde no cache um resultado que já nasceu desatualizado;
+# db_generation é o último valor lido de search_cache_state
+_search_cache_sync = {'last_id': None, 'checked': 0.0, 'generation': 0, 'db_generation': None}
+# Os arquivos ficam no volume local do pod, então cada job só pode ser processado no host que recebeu o upload
+WORKER_HOST = socket.gethostname()
+
+# Métricas Prometheus expostas em /metrics. Com vários processos (gunicorn, worker.py), defina
+# PROMETHEUS_MULTIPROC_DIR com um diretório compartilhado antes de iniciar os processos.
+OCR_SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+OCR_RASTERIZE_SECONDS = Histogram('atestados_ocr_rasterize_seconds', 'Tempo de rasterização (pdftoppm) por página',
+                                  buckets=OCR_SECONDS_BUCKETS)
+OCR_PAGE_SECONDS = Histogram('atestados_ocr_page_seconds', 'Tempo de OCR (tesseract) por página', buckets=OCR_SECONDS_BUCKETS)
+PAGES_TOTAL = Counter('atestados_pages_total', 'Páginas extraídas, por origem do texto', ['source'])
+DATE_EXTRACTION_SECONDS = Histogram('atestados_date_extraction_seconds', 'Tempo de extração das datas de um documento',
+                                    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1))
+DATE_EXTRACTION_FAILURES = Counter('atestados_date_extraction_failures_total',
+                                   'Documentos sem datas reconhecidas, por motivo', ['reason'])
+DB_INSERT_SECONDS = Histogram('atestados_db_insert_seconds', 'Latência das inserções de documentos no MySQL', ['kind'])
+SEARCH_SECONDS = Histogram('atestados_search_seconds', 'Latência das buscas', ['kind'])
+DEDUPE_HITS = Counter('atestados_dedupe_hits_total', 'Documentos descartados por já estarem no banco', ['kind'])
+SEARCH_CACHE_EVENTS = Counter('atestados_search_cache_total', 'Consultas e remoções do cache da busca por datas',
+                              ['event'])
+# Consultas e remoções do cache de OCR; o OCR roda no worker.py, então /ocr-cache/stats lê estes contadores
+# somados entre os processos (via PROMETHEUS_MULTIPROC_DIR) em vez de variáveis do processo web
+OCR_CACHE_EVENTS = Counter('atestados_ocr_cache_total', 'Consultas e remoções do cache de OCR', ['event'])
+UPLOADS_IN_FLIGHT = Gauge('atestados_uploads_in_flight', 'Uploads sendo processados pelos workers neste momento',
+                          multiprocess_mode='livesum')
+
 # Função para verificar se o arquivo tem uma extensão permitida
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-# Função para processar um arquivo PDF, convertendo-o em imagens e extraindo o texto
-def process_pdf(pdf_path):
-    images = convert_from_path(pdf_path)  # Converte as páginas do PDF em imagens
+# Função para preparar a imagem de uma página conforme o perfil (recorte e binarização)
+# Sem pré-processamento, devolve o próprio caminho e o tesseract lê o arquivo direto do disco
+def preprocess_page(image_path, profile):
+    if not profile['crop'] and not profile['binarize']:
+        return image_path
+    # crop/convert/point carregam a página e devolvem imagens novas, então o arquivo pode ser fechado ao sair do with
+    with Image.open(image_path) as page:
+        image = page
+        if profile['crop']:
+            left, top, right, bottom = profile['crop']
+            width, height = image.size
+            image = image.crop((int(left * width), int(top * height), int(right * width), int(bottom * height)))
+        if profile['binarize']:
+            threshold = profile['binarize']
+            image = image.convert('L').point(lambda value: 255 if value >= threshold else 0, mode='1')
+    return image
+
+# Função para rasterizar e extrair o texto de um bloco de páginas (executada nos processos do pool)
+# Retorna uma tupla (texto, segundos de rasterização, segundos de OCR) por página; as métricas são
+# registradas pelo processo principal, já que os processos do pool não são lidos pelo /metrics
+def ocr_pages(pdf_path, first_page, last_page, profile=None):
+    profile = profile or OCR_PROFILE
+    tesseract_config = f"--psm {profile['psm']} --oem {profile['oem']}"
+    extracted_text = []
+    with tempfile.TemporaryDirectory() as output_folder:
+        # As páginas são gravadas em disco pelo pdftoppm em vez de carregadas como imagens PIL na memória
+        started = time.perf_counter()
+        image_paths = convert_from_path(pdf_path, dpi=profile['dpi'], grayscale=profile['grayscale'],
+                                        first_page=first_page, last_page=last_page,
+                                        output_folder=output_folder, paths_only=True)
+        rasterize_seconds = (time.perf_counter() - started) / max(len(image_paths), 1)  # O bloco é rasterizado de uma vez
+        for image_path in image_paths:
+            started = time.perf_counter()
+            image = preprocess_page(image_path, profile)
+            text = pytesseract.image_to_string(image, lang=profile['lang'], config=tesseract_config)  # Extrai o texto da imagem usando OCR
+            extracted_text.append((text, rasterize_seconds, time.perf_counter() - started))
+            os.remove(image_path)  # Libera a imagem da página assim que o OCR termina
+    return extracted_text
+
+# Função para ler a camada de texto embutida de cada página com o pdftotext (poppler-utils)
+# Retorna uma lista com o texto de cada página, ou None nas páginas sem texto utilizável
+def extract_text_layer(pdf_path, page_count):
+    try:
+        output = subprocess.run(['pdftotext', '-enc', 'UTF-8', pdf_path, '-'],
+                                capture_output=True, check=True, timeout=120).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Erro ao ler a camada de texto do PDF: {e}")
+        return [None] * page_count
+
+    pages = output.decode('utf-8', errors='replace').split('\f')  # O pdftotext separa as páginas com form feed
+    text_pages = []
+    for page_number in range(page_count):
+        text = pages[page_number] if page_number < len(pages) else ''
+        usable = sum(char.isalnum() for char in text) >= PDF_TEXT_MIN_CHARS
+        text_pages.append(text if usable else None)
+    return text_pages
+
+# Função para agrupar páginas em blocos (first, last) de páginas consecutivas com no máximo OCR_PAGE_CHUNK páginas
+def page_chunks(pages):
+    chunks = []
+    for page in pages:
+        if chunks and page == chunks[-1][1] + 1 and page - chunks[-1][0] < OCR_PAGE_CHUNK:
+            chunks[-1][1] = page
+        else:
+            chunks.append([page, page])
+    return [tuple(chunk) for chunk in chunks]
+
+# Função para processar um arquivo PDF: usa a camada de texto quando existe e faz OCR apenas nas demais páginas
+# Se page_metrics for uma lista, recebe um registro por página indicando o caminho usado ('text' ou 'ocr')
+# profile escolhe as opções de OCR (padrão: OCR_PROFILE)
+def process_pdf(pdf_path, workers=None, page_metrics=None, profile=None):
+    if workers is None:
+        workers = OCR_WORKERS
+    profile = profile or OCR_PROFILE
+    page_count = pdfinfo_from_path(pdf_path)['Pages']  # Obtém o número de páginas sem rasterizar o documento
+
+    text_pages = extract_text_layer(pdf_path, page_count) if PDF_TEXT_LAYER else [None] * page_count
+    ocr_page_numbers = [number for number, text in enumerate(text_pages, start=1) if text is None]
+
+    # Divide as páginas sem texto em blocos; só um bloco por processo é rasterizado de cada vez
+    chunks = page_chunks(ocr_page_numbers)
+    first_pages = [first for first, _ in chunks]
+    last_pages = [last for _, last in chunks]
+
+    if workers <= 1 or len(chunks) <= 1:
+        ocr_chunks = [ocr_pages(pdf_path, first, last, profile) for first, last in chunks]
+    else:
+        # map() devolve os textos na ordem dos blocos, mantendo a ordem das páginas
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            ocr_chunks = list(executor.map(ocr_pages, repeat(pdf_path), first_pages, last_pages, repeat(profile)))
+
+    ocr_results = iter([page for chunk in ocr_chunks for page in chunk])
     extracted_text = []
-    for image in images:
-        text = pytesseract.image_to_string(image, output_type=pytesseract.Output.DICT)  # Extrai o texto de cada imagem usando OCR
-        extracted_text.append(text['text'])  # Adiciona o texto extraído a uma lista
+    for page_number, text in enumerate(text_pages, start=1):
+        metric = {'page': page_number, 'source': 'text'}
+        if text is None:
+            text, rasterize_seconds, ocr_seconds = next(ocr_results)
+            OCR_RASTERIZE_SECONDS.observe(rasterize_seconds)
+            OCR_PAGE_SECONDS.observe(ocr_seconds)
+            metric.update(source='ocr', rasterize_seconds=round(rasterize_seconds, 3), ocr_seconds=round(ocr_seconds, 3))
+        PAGES_TOTAL.labels(metric['source']).inc()
+        extracted_text.append(text)
+        if page_metrics is not None:
+            metric['chars'] = len(text)
+            page_metrics.append(metric)
+
     combined_text = ' '.join(extracted_text)  # Combina todo o texto extraído em uma única string
     return combined_text
 
-# Função para extrair datas específicas do texto
-def extract_dates(text):
-    # Normaliza o texto para remover acentos
-    normalized_text = unidecode.unidecode(text)
+# Tabela de transliteração do unidecode montada sob demanda, um caractere por vez.
+# O unidecode translitera cada caractere de forma independente, então str.translate com essa tabela
+# produz exatamente o mesmo resultado, porém com o laço em C em vez de Python.
+class UnidecodeTable(dict):
+    def __missing__(self, codepoint):
+        self[codepoint] = unidecode.unidecode(chr(codepoint))
+        return self[codepoint]
 
-    # Padrões para corresponder "Data de início:" e "Conclusão Efetiva:"
-    patterns = [
-        r'Data\s*de\s*inicio\s*[:\s]*(\d{2}/\d{2}/\d{4})',  # Ex: "Data de início: 01/01/2023"
-        r'Conclusao\s*Efetiva\s*[:\s]*(\d{2}/\d{2}/\d{4})'  # Ex: "Conclusão Efetiva: 31/12/2023"
-    ]
+_unidecode_table = UnidecodeTable()
 
-    # Compilação dos padrões para maior eficiência
-    regex = re.compile('|'.join(patterns), re.IGNORECASE)
+# Função para normalizar o texto removendo acentos (equivalente a unidecode.unidecode)
+def normalize_text(text):
+    return text if text.isascii() else text.translate(_unidecode_table)
 
-    matches = regex.findall(normalized_text)  # Procura por correspondências no texto
-    
-    start_date, end_date = None, None
-    
-    # Se encontrar correspondências, tenta analisar as datas
-    if matches:
-        try:
-            if len(matches) > 0:
-                start_date = datetime.strptime(matches[0][0], '%d/%m/%Y').strftime('%Y-%m-%d')
-            if len(matches) > 1:
-                end_date = datetime.strptime(matches[1][0], '%d/%m/%Y').strftime('%Y-%m-%d')
-        except ValueError as e:
-            print(f"Erro: Formato de data incorreto no texto. Exceção: {e}")
-    else:
-        # Se os padrões principais não funcionarem, tenta encontrar padrões de data genéricos
-        generic_date_pattern = r'\b(\d{2}/\d{2}/\d{4})\b'
-        date_matches = re.findall(generic_date_pattern, normalized_text)
+# Padrões de data compilados uma única vez: "Data de início:", "Conclusão Efetiva:" e datas genéricas dd/mm/aaaa.
+# Uma única varredura encontra os três tipos; as datas genéricas só são usadas quando não há nenhuma data rotulada.
+# O texto normalizado é sempre ASCII, então re.ASCII não muda o resultado; o lookahead descarta rapidamente
+# as posições que não podem iniciar nenhum dos padrões.
+DATE_REGEX = re.compile(
+    r'(?=[DdCc0-9])(?:'
+    r'Data\s*de\s*inicio\s*[:\s]*(?P<start>\d{2}/\d{2}/\d{4})'  # Ex: "Data de início: 01/01/2023"
+    r'|Conclusao\s*Efetiva\s*[:\s]*(?P<end>\d{2}/\d{2}/\d{4})'  # Ex: "Conclusão Efetiva: 31/12/2023"
+    r'|\b(?P<generic>\d{2}/\d{2}/\d{4})\b)',
+    re.IGNORECASE | re.ASCII,
+)
 
-        if len(date_matches) >= 2:
-            try:
-                start_date = datetime.strptime(date_matches[0], '%d/%m/%Y').strftime('%Y-%m-%d')
-                end_date = datetime.strptime(date_matches[1], '%d/%m/%Y').strftime('%Y-%m-%d')
-            except ValueError as e:
-                print(f"Erro: Formato de data incorreto no texto. Exceção: {e}")
+# Função para converter uma data dd/mm/aaaa para aaaa-mm-dd sem passar pelo strptime
+def parse_br_date(value):
+    day, month, year = int(value[0:2] or 0), int(value[3:5] or 0), int(value[6:10] or 0)
+    if year >= 1000 and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]:
+        return f'{year}-{month:02d}-{day:02d}'
+    # Datas inválidas (e anos < 1000) seguem pelo strptime, que gera o mesmo ValueError/resultado de antes
+    return datetime.strptime(value, '%d/%m/%Y').strftime('%Y-%m-%d')
+
+# Função que localiza e converte as datas do texto; retorna (data_inicio, data_fim, erro)
+def find_dates(text):
+    normalized_text = normalize_text(text)  # Normaliza o texto para remover acentos
+
+    # Como na versão anterior, as duas primeiras correspondências rotuladas são usadas na ordem em que aparecem,
+    # e de cada uma é lida a data do rótulo "Data de início" (vazia quando o rótulo é "Conclusão Efetiva")
+    labelled, generic = [], []
+    for match in DATE_REGEX.finditer(normalized_text):
+        if match.lastgroup == 'generic':
+            if len(generic) < 2:
+                generic.append(match.group('generic'))
+            continue
+        labelled.append(match.group('start') or '')
+        if len(labelled) == 2:
+            break
+
+    # Se não houver datas rotuladas, usa as duas primeiras datas genéricas
+    dates = labelled or (generic if len(generic) >= 2 else [])
+
+    start_date, end_date, error = None, None, None
+    try:
+        if len(dates) > 0:
+            start_date = parse_br_date(dates[0])
+        if len(dates) > 1:
+            end_date = parse_br_date(dates[1])
+    except ValueError as e:
+        error = e
+    return start_date, end_date, error
+
+# Função para extrair datas específicas do texto
+def extract_dates(text):
+    with DATE_EXTRACTION_SECONDS.time():
+        start_date, end_date, error = find_dates(text)
+    if error:
+        DATE_EXTRACTION_FAILURES.labels('invalid_date').inc()
+        print(f"Erro: Formato de data incorreto no texto. Exceção: {error}")
 
     if not start_date and not end_date:
+        if not error:
+            DATE_EXTRACTION_FAILURES.labels('not_found').inc()
         print("Não foi possível encontrar o padrão de data no texto, salvando sem datas.")
     
     return start_date, end_date
 
+# Função para extrair as datas de vários textos de uma vez (reprocessamento em massa, sem mensagens por texto)
+def extract_dates_many(texts):
+    return [find_dates(text)[:2] for text in texts]
+
 # Função para calcular o hash do texto extraído (usado para evitar duplicações)
 def calculate_hash(text):
     return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
-# Função para salvar os dados extraídos no banco de dados MySQL
-def save_to_mysql(text, text_hash, start_date, end_date, pdf_name):
+# Funções para (des)compactar o texto extraído, guardado em pdf_text_body separado dos metadados de pdf_text
+def compress_text(text):
+    return zlib.compress(text.encode('utf-8'), TEXT_COMPRESSION_LEVEL)
+
+def decompress_text(body):
+    return zlib.decompress(body).decode('utf-8')
+
+# Função para calcular o SHA-256 dos bytes de um arquivo em disco, lendo em blocos
+def calculate_file_hash(file_path, chunk_size=1024 * 1024):
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+# Marcadores de objeto de página no PDF ("/Type /Page", mas não "/Type /Pages"), contados durante o upload.
+# Em PDFs com object streams os marcadores ficam compactados, então a contagem serve só para recusar cedo
+# arquivos grandes demais; o número exato de páginas é conferido pelo worker com o pdfinfo.
+PAGE_MARKER_REGEX = re.compile(rb'/Type\s{0,8}/Page(?![A-Za-z])')
+
+# Destino de um arquivo enviado: grava os blocos diretamente no diretório de uploads à medida que chegam,
+# calculando o SHA-256 e contando as páginas no caminho (sem arquivo temporário nem segunda gravação)
+class UploadStream:
+    TAIL = 64  # Bytes mantidos entre blocos para encontrar marcadores divididos na fronteira
+
+    def __init__(self, directory, filename):
+        # Prefixo único evita que dois uploads com o mesmo nome sobrescrevam um ao outro antes do OCR
+        self.path = os.path.join(directory, f'{uuid.uuid4().hex}-{secure_filename(filename or "") or "upload"}')
+        self.file = open(self.path, 'w+b')
+        self.sha256 = hashlib.sha256()
+        self.pages = 0
+        self.kept = False  # Marcado quando o arquivo é entregue à fila; os demais são apagados no fim da requisição
+        self._tail = b''
+        self._counted_until = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.file.write(data)
+
+        # Conta os marcadores que terminam antes do último byte (é preciso um byte para descartar "/Pages")
+        window = self._tail + data
+        limit = len(window) - 1
+        for match in PAGE_MARKER_REGEX.finditer(window, self._counted_until):
+            if match.end() > limit:
+                break
+            self.pages += 1
+            self._counted_until = match.end()
+        self._tail = window[-self.TAIL:]
+        self._counted_until = max(0, self._counted_until - (len(window) - len(self._tail)))
+
+        if MAX_UPLOAD_PAGES and self.pages > MAX_UPLOAD_PAGES:
+            self.discard()
+            raise RequestEntityTooLarge(f'O PDF tem mais de {MAX_UPLOAD_PAGES} páginas.')
+        return len(data)
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)  # seek, read, close etc. usados pelo Werkzeug/FileStorage
+
+# Requisição que grava os arquivos enviados diretamente no diretório de uploads
+class UploadRequest(Request):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_streams = []  # Todos os arquivos gravados por esta requisição
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = UploadStream(app.config['UPLOAD_FOLDER'], filename)
+        self.upload_streams.append(stream)
+        return stream
+
+app.request_class = UploadRequest
+
+# Apaga os arquivos da requisição que não foram para a fila: campos que não são "file", arquivos recusados,
+# e os já gravados quando um arquivo seguinte estoura o limite (413) ou a rota não trata uploads
+@app.teardown_request
+def discard_unqueued_uploads(error=None):
+    for stream in getattr(request, 'upload_streams', []):
+        if not stream.kept:
+            stream.discard()
+
+# Definição das tabelas da aplicação (criadas uma única vez na inicialização ou pelo comando "flask init-db")
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS pdf_text (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        text_hash VARCHAR(64) UNIQUE,
+        d1 DATE,
+        d2 DATE,
+        pdf_name VARCHAR(255),
+        file_hash CHAR(64),
+        INDEX idx_pdf_text_d1_d2 (d1, d2),
+        INDEX idx_pdf_text_d2_d1 (d2, d1),
+        INDEX idx_pdf_text_file_hash (file_hash)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS pdf_text_body (
+        pdf_id INT PRIMARY KEY,
+        body LONGBLOB NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS uploaded_files (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        pdf_name VARCHAR(255) UNIQUE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS ingest_jobs (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        pdf_name VARCHAR(255),
+        file_path VARCHAR(1024),
+        file_hash CHAR(64),
+        host VARCHAR(255),
+        status VARCHAR(16) NOT NULL DEFAULT 'queued',
+        message TEXT,
+        warning TEXT,
+        page_metrics TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_ingest_jobs_claim (host, status, id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS pdf_search (
+        pdf_id INT PRIMARY KEY,
+        content LONGTEXT,
+        FULLTEXT INDEX ft_pdf_search_content (content)
+    ) DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS ocr_cache (
+        file_hash CHAR(64) PRIMARY KEY,
+        text LONGTEXT,
+        ocr_profile VARCHAR(255) NOT NULL DEFAULT '',
+        size_bytes INT NOT NULL,
+        last_used_at DATETIME(6) NOT NULL,
+        INDEX idx_ocr_cache_last_used (last_used_at)
+    )
+    ''',
+    # Geração do cache da busca, incrementada por quem altera as datas de documentos já gravados (backfill.py)
+    '''
+    CREATE TABLE IF NOT EXISTS search_cache_state (
+        id TINYINT PRIMARY KEY,
+        generation INT NOT NULL
+    )
+    ''',
+]
+
+# Colunas adicionadas depois da criação das tabelas (aplicadas em bancos já existentes)
+SCHEMA_COLUMNS = [
+    ('ingest_jobs', 'file_hash', 'CHAR(64) AFTER file_path'),
+    ('ingest_jobs', 'page_metrics', 'TEXT AFTER warning'),
+    ('pdf_text', 'file_hash', 'CHAR(64) AFTER pdf_name'),
+    ('ocr_cache', 'ocr_profile', "VARCHAR(255) NOT NULL DEFAULT '' AFTER text"),
+]
+
+# Índices adicionados depois da criação das tabelas (aplicados em bancos já existentes)
+SCHEMA_INDEXES = [
+    ('pdf_text', 'idx_pdf_text_d1_d2', '(d1, d2)'),
+    ('pdf_text', 'idx_pdf_text_d2_d1', '(d2, d1)'),
+    ('pdf_text', 'idx_pdf_text_file_hash', '(file_hash)'),
+    ('ingest_jobs', 'idx_ingest_jobs_status', '(status)'),  # Contagem da fila no /metrics
+]
+
+# Função para adicionar uma coluna a uma tabela existente, caso ainda não exista
+def ensure_column(cursor, table, column, definition):
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    ''', (table, column))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+# Função para criar um índice em uma tabela existente, caso ainda não exista
+def ensure_index(cursor, table, index, definition):
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    ''', (table, index))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f'ALTER TABLE {table} ADD INDEX {index} {definition}')
+
+# Função para criar as tabelas do banco de dados, caso ainda não existam
+def init_schema():
+    connection = get_connection()
+    cursor = connection.cursor()
     try:
-        connection = mysql.connector.connect(**db_config)  # Conecta ao banco de dados
-        cursor = connection.cursor()
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        for table, column, definition in SCHEMA_COLUMNS:
+            ensure_column(cursor, table, column, definition)
+        for table, index, definition in SCHEMA_INDEXES:
+            ensure_index(cursor, table, index, definition)
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
 
-        # Criação da tabela se não existir
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS pdf_text (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                text LONGTEXT,
-                text_hash VARCHAR(64) UNIQUE,
-                d1 DATE,
-                d2 DATE,
-                pdf_name VARCHAR(255)
-            )
-        ''')
+# Comando de migração: flask --app app init-db
+@app.cli.command('init-db')
+def init_db_command():
+    init_schema()
+    print('Tabelas criadas/verificadas com sucesso.')
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS uploaded_files (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                pdf_name VARCHAR(255) UNIQUE
-            )
-        ''')
+# Função para salvar os dados extraídos no banco de dados MySQL
+def save_to_mysql(text, text_hash, start_date, end_date, pdf_name, file_hash=None):
+    connection = cursor = None
+    started = time.perf_counter()
+    try:
+        connection = get_connection()  # Obtém uma conexão do pool
+        cursor = connection.cursor()
 
         # Verifica se o hash do texto já existe no banco de dados
         cursor.execute('SELECT COUNT(*) FROM pdf_text WHERE text_hash = %s', (text_hash,))
         if cursor.fetchone()[0] > 0:
+            DEDUPE_HITS.labels('text').inc()
             return False
 
-        # Insere os dados extraídos na tabela pdf_text
+        # Insere os metadados na tabela pdf_text
         cursor.execute('''
-            INSERT INTO pdf_text (text, text_hash, d1, d2, pdf_name) 
+            INSERT INTO pdf_text (text_hash, d1, d2, pdf_name, file_hash) 
             VALUES (%s, %s, %s, %s, %s)
-        ''', (text, text_hash, start_date, end_date, pdf_name))
+        ''', (text_hash, start_date, end_date, pdf_name, file_hash))
+        pdf_id = cursor.lastrowid
+
+        # Insere o texto compactado em pdf_text_body, fora das linhas percorridas pelas buscas
+        cursor.execute('''
+            INSERT INTO pdf_text_body (pdf_id, body)
+            VALUES (%s, %s)
+        ''', (pdf_id, compress_text(text)))
+
+        # Insere o texto normalizado no índice FULLTEXT da busca textual
+        cursor.execute('''
+            INSERT INTO pdf_search (pdf_id, content)
+            VALUES (%s, %s)
+        ''', (pdf_id, normalize_text(text)))
         
         # Insere o nome do arquivo na tabela uploaded_files
         cursor.execute('''
@@ -132,61 +644,757 @@ def save_to_mysql(text, text_hash, start_date, end_date, pdf_name):
         ''', (pdf_name,))
         
         connection.commit()  # Confirma a transação
+        DB_INSERT_SECONDS.labels('single').observe(time.perf_counter() - started)
+        invalidate_files_count()
+        invalidate_search_cache(start_date, end_date)
         return True
     except mysql.connector.Error as err:
         print(f"Erro: {err}")
         return False
     finally:
-        cursor.close()  # Fecha o cursor
-        connection.close()  # Fecha a conexão com o banco de dados
+        if cursor:
+            cursor.close()  # Fecha o cursor
+        if connection:
+            connection.close()  # Devolve a conexão ao pool
 
-# Função para buscar relatórios no banco de dados com base em um intervalo de datas
-def search_reports(start_date, end_date):
+# Função para salvar vários documentos de uma vez (ingestão em massa), com inserções de várias linhas em uma transação
+# Cada registro é um dicionário com text, text_hash, d1, d2, pdf_name e file_hash; retorna as posições (em records)
+# dos registros inseridos. De vários registros com o mesmo texto, só o primeiro é inserido
+def save_many_to_mysql(records):
+    started = time.perf_counter()
+    connection = get_connection()
+    cursor = connection.cursor()
+    try:
+        # Descarta os textos que já estão no banco e as repetições dentro do próprio lote
+        hashes = list({record['text_hash'] for record in records})
+        placeholders = ', '.join(['%s'] * len(hashes))
+        cursor.execute(f'SELECT text_hash FROM pdf_text WHERE text_hash IN ({placeholders})', hashes)
+        seen = {row[0] for row in cursor.fetchall()}
+        new_records, new_positions = [], set()
+        for position, record in enumerate(records):
+            if record['text_hash'] not in seen:
+                seen.add(record['text_hash'])
+                new_records.append(record)
+                new_positions.add(position)
+        DEDUPE_HITS.labels('text').inc(len(records) - len(new_records))
+        if not new_records:
+            return set()
+
+        # O executemany do mysql-connector transforma estes INSERTs em um único INSERT com várias linhas
+        cursor.executemany('''
+            INSERT INTO pdf_text (text_hash, d1, d2, pdf_name, file_hash)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', [(r['text_hash'], r['d1'], r['d2'], r['pdf_name'], r['file_hash']) for r in new_records])
+
+        new_hashes = [record['text_hash'] for record in new_records]
+        placeholders = ', '.join(['%s'] * len(new_hashes))
+        cursor.execute(f'SELECT text_hash, id FROM pdf_text WHERE text_hash IN ({placeholders})', new_hashes)
+        ids = dict(cursor.fetchall())
+
+        cursor.executemany(
+            'INSERT INTO pdf_text_body (pdf_id, body) VALUES (%s, %s)',
+            [(ids[r['text_hash']], compress_text(r['text'])) for r in new_records],
+        )
+        cursor.executemany(
+            'INSERT INTO pdf_search (pdf_id, content) VALUES (%s, %s)',
+            [(ids[r['text_hash']], normalize_text(r['text'])) for r in new_records],
+        )
+        cursor.executemany(
+            'INSERT IGNORE INTO uploaded_files (pdf_name) VALUES (%s)',
+            [(r['pdf_name'],) for r in new_records],
+        )
+        connection.commit()
+        DB_INSERT_SECONDS.labels('batch').observe(time.perf_counter() - started)
+        invalidate_files_count()
+        for record in new_records:
+            invalidate_search_cache(record['d1'], record['d2'])
+        return new_positions
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+# Função para listar quais hashes de arquivo (SHA-256 dos bytes do PDF) já foram gravados
+def existing_file_hashes(file_hashes, batch_size=1000):
+    file_hashes = list(file_hashes)
+    existing = set()
+    connection = get_connection()
+    cursor = connection.cursor()
     try:
-        connection = mysql.connector.connect(**db_config)
+        for offset in range(0, len(file_hashes), batch_size):
+            batch = file_hashes[offset:offset + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'SELECT file_hash FROM pdf_text WHERE file_hash IN ({placeholders})', batch)
+            existing.update(row[0] for row in cursor.fetchall())
+    finally:
+        cursor.close()
+        connection.close()
+    return existing
+
+# Função para listar uma página dos arquivos enviados; retorna os arquivos e o cursor (id) da próxima página
+def list_uploaded_files(after_id=0, limit=None):
+    limit = max(1, min(limit or FILES_PAGE_SIZE, FILES_MAX_PAGE_SIZE))
+    connection = cursor = None
+    try:
+        connection = get_connection()
         cursor = connection.cursor()
 
-        # Consulta para buscar textos de PDF dentro do intervalo de datas especificado
-        query = '''
-            SELECT text, pdf_name
-            FROM pdf_text
-            WHERE (d1 <= %s AND d2 >= %s) OR (d1 <= %s AND d2 >= %s)
-        '''
-        cursor.execute(query, (start_date, end_date, end_date, start_date))
-        results = cursor.fetchall()
+        cursor.execute('''
+            SELECT id, pdf_name
+            FROM uploaded_files
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+        ''', (after_id, limit + 1))
+        rows = cursor.fetchall()
+
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [{'id': row[0], 'pdf_name': row[1]} for row in rows[:limit]], next_cursor
+    except mysql.connector.Error as err:
+        print(f"Erro: {err}")
+        return [], None
+    finally:
+        if cursor:
+            cursor.close()  # Fecha o cursor
+        if connection:
+            connection.close()  # Devolve a conexão ao pool
+
+# Função para obter o total de arquivos enviados, consultando o banco no máximo uma vez a cada FILES_COUNT_TTL segundos
+def count_uploaded_files():
+    if _files_count_cache['value'] is not None and time.monotonic() < _files_count_cache['expires']:
+        return _files_count_cache['value']
+    connection = cursor = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute('SELECT COUNT(*) FROM uploaded_files')
+        total = cursor.fetchone()[0]
+    except mysql.connector.Error as err:
+        print(f"Erro: {err}")
+        return _files_count_cache['value']
+    finally:
+        if cursor:
+            cursor.close()  # Fecha o cursor
+        if connection:
+            connection.close()  # Devolve a conexão ao pool
+    _files_count_cache.update(value=total, expires=time.monotonic() + FILES_COUNT_TTL)
+    return total
 
+# Função para descartar o total em cache depois que novos arquivos são gravados
+def invalidate_files_count():
+    _files_count_cache['expires'] = 0.0
+
+# Função para converter uma data (datetime, date ou texto aaaa-mm-dd) em date
+def as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+# Função para incrementar um contador do cache da busca por datas
+def _count_search_cache(event, amount=1):
+    SEARCH_CACHE_EVENTS.labels(event).inc(amount)
+
+# Função para remover do cache as buscas cujo intervalo se sobrepõe ao período [d1, d2] de um documento gravado
+# (a mesma condição da consulta de search_reports; documentos sem as duas datas nunca aparecem na busca)
+def invalidate_search_cache(d1, d2):
+    if d1 is None or d2 is None:
+        return
+    d1, d2 = as_date(d1), as_date(d2)
+    with _search_cache_lock:
+        _search_cache_sync['generation'] += 1
+        stale = [key for key in _search_cache if d1 <= key[1] and d2 >= key[0]]
+        for key in stale:
+            del _search_cache[key]
+    if stale:
+        _count_search_cache('invalidations', len(stale))
+
+# Função para invalidar o cache com os documentos gravados por outros processos desde a última verificação.
+# Os ids de pdf_text são crescentes, então basta ler as linhas novas; alterações de d1/d2 em documentos antigos
+# (backfill.py) incrementam search_cache_state e esvaziam o cache inteiro. Gravações
+# concluídas fora de ordem só saem do cache pela validade SEARCH_CACHE_TTL.
+def sync_search_cache():
+    now = time.monotonic()
+    with _search_cache_lock:
+        if now - _search_cache_sync['checked'] < SEARCH_CACHE_SYNC_INTERVAL:
+            return
+        _search_cache_sync['checked'] = now
+        last_id = _search_cache_sync['last_id']
+
+    connection = get_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT COALESCE(MAX(generation), 0) FROM search_cache_state')
+        db_generation = cursor.fetchone()[0]
+        if last_id is None:
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM pdf_text')
+            rows, last_id = [], cursor.fetchone()[0]
+            with _search_cache_lock:
+                _search_cache.clear()  # Sem referência anterior, nada do que está no cache pode ser confirmado
+        else:
+            cursor.execute('SELECT id, d1, d2 FROM pdf_text WHERE id > %s ORDER BY id', (last_id,))
+            rows = cursor.fetchall()
+    finally:
         cursor.close()
         connection.close()
 
-        # Retorna apenas os nomes dos PDFs e indica que há mais informações disponíveis
-        filtered_results = [{'pdf_name': result[1]} for result in results]
+    cleared = 0
+    with _search_cache_lock:
+        if _search_cache_sync['db_generation'] not in (None, db_generation):
+            _search_cache_sync['generation'] += 1
+            cleared = len(_search_cache)
+            _search_cache.clear()
+        _search_cache_sync['db_generation'] = db_generation
+    if cleared:
+        _count_search_cache('invalidations', cleared)
+
+    for row_id, d1, d2 in rows:
+        invalidate_search_cache(d1, d2)
+        last_id = max(last_id, row_id)
+    with _search_cache_lock:
+        _search_cache_sync['last_id'] = last_id
+
+# Função para avisar todos os processos que documentos já gravados mudaram: o próximo sync_search_cache de
+# cada um esvazia o cache. Roda na transação do chamador, que faz o commit
+def bump_search_cache_generation(cursor):
+    cursor.execute('''
+        INSERT INTO search_cache_state (id, generation) VALUES (1, 1)
+        ON DUPLICATE KEY UPDATE generation = generation + 1
+    ''')
 
-        return filtered_results
+# Função para buscar uma página de resultados no cache; retorna None quando não há entrada válida
+def search_cache_get(key):
+    if SEARCH_CACHE_SIZE <= 0:
+        return None
+    try:
+        sync_search_cache()
     except mysql.connector.Error as err:
         print(f"Erro: {err}")
-        return []
+        return None
+    with _search_cache_lock:
+        entry = _search_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _search_cache.move_to_end(key)  # Entrada usada mais recentemente
+        else:
+            _search_cache.pop(key, None)
+            entry = None
+    _count_search_cache('hits' if entry else 'misses')
+    if entry is None:
+        return None
+    return [dict(result) for result in entry[1]], entry[2]
 
-# Rota principal da aplicação (exibe a página inicial e lida com uploads e buscas)
-@app.route('/', methods=['GET', 'POST'])
-def index():
-    results = []
-    selected_start_date = None
-    selected_end_date = None
-    pdf_list = []
+# Função para ler a geração atual do cache, antes de consultar o banco
+def search_cache_generation():
+    with _search_cache_lock:
+        return _search_cache_sync['generation']
+
+# Função para guardar uma página de resultados no cache, descartando as entradas usadas há mais tempo
+# generation é o valor de search_cache_generation() lido antes da consulta ao banco
+def search_cache_put(key, results, next_cursor, generation):
+    if SEARCH_CACHE_SIZE <= 0:
+        return
+    evicted = 0
+    with _search_cache_lock:
+        if generation != _search_cache_sync['generation']:
+            return  # Um documento foi gravado durante a consulta
+        _search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, [dict(result) for result in results], next_cursor)
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+            evicted += 1
+    if evicted:
+        _count_search_cache('evictions', evicted)
 
-    # Obtém a lista de arquivos PDF enviados que estão no banco de dados
+# Funções para montar e ler o cursor da busca por datas: a posição (d1, d2, id) do último resultado, ex. "2020-01-01_2020-06-30_15"
+def format_search_cursor(d1, d2, pdf_id):
+    return f'{d1:%Y-%m-%d}_{d2:%Y-%m-%d}_{pdf_id}'
+
+def parse_search_cursor(value):
+    if not value:
+        return None
+    d1, d2, pdf_id = value.split('_')  # ValueError quando o cursor não está no formato esperado
+    return date.fromisoformat(d1), date.fromisoformat(d2), int(pdf_id)
+
+# Consulta da busca por datas: documentos cujo período [d1, d2] se sobrepõe ao intervalo buscado, na ordem
+# (d1, d2, id), continuando da posição do último resultado da página anterior ({keyset}). O índice é escolhido
+# por choose_search_index e fixado com FORCE INDEX, para que o plano não dependa das estimativas do otimizador
+SEARCH_QUERY = '''
+    SELECT id, pdf_name, d1, d2
+    FROM pdf_text FORCE INDEX ({index})
+    WHERE d1 <= %s AND d2 >= %s {keyset}
+    ORDER BY d1, d2, id
+    LIMIT %s
+'''
+SEARCH_KEYSET = 'AND (d1 > %s OR (d1 = %s AND (d2 > %s OR (d2 = %s AND id > %s))))'
+
+# Função para escolher o índice da busca por datas.
+# idx_pdf_text_d1_d2 já está na ordem (d1, d2, id) (o InnoDB acrescenta o id a cada entrada): o MySQL percorre
+# d1 <= fim, filtra d2 >= início no próprio índice e para depois de page_size + 1 resultados, sem filesort. Em
+# intervalos recentes quase todos os documentos começam antes do fim buscado, mas terminaram antes do início, e
+# essa leitura passaria por quase o índice inteiro até achar a primeira página. Por isso conta, lendo no máximo
+# SEARCH_D2_SCAN_LIMIT entradas de idx_pdf_text_d2_d1, os documentos com d2 >= início: quando são menos que o
+# limite, a consulta lê só esses pelo (d2, d1) e ordena em memória no máximo SEARCH_D2_SCAN_LIMIT linhas.
+def choose_search_index(cursor, start_date):
+    cursor.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM pdf_text FORCE INDEX (idx_pdf_text_d2_d1) WHERE d2 >= %s LIMIT %s
+        ) AS ending_after_start
+    ''', (start_date, SEARCH_D2_SCAN_LIMIT))
+    return 'idx_pdf_text_d2_d1' if cursor.fetchone()[0] < SEARCH_D2_SCAN_LIMIT else 'idx_pdf_text_d1_d2'
+
+# Função para buscar relatórios no banco de dados com base em um intervalo de datas
+# after é a posição (d1, d2, id) devolvida pela página anterior (parse_search_cursor), ou None para a primeira página
+# Retorna uma página de resultados e o cursor da próxima página, ou None quando não há mais resultados.
+# Erros do banco são repassados a quem chamou, para não serem confundidos com uma busca sem resultados.
+@SEARCH_SECONDS.labels('date').time()
+def search_reports(start_date, end_date, after=None, page_size=None):
+    page_size = max(1, min(page_size or SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE))
+    cache_key = (as_date(start_date), as_date(end_date), after, page_size)
+    cached = search_cache_get(cache_key)
+    if cached is not None:
+        return cached
+    generation = search_cache_generation()
+    connection = cursor = None
     try:
-        connection = mysql.connector.connect(**db_config)
+        connection = get_connection()
         cursor = connection.cursor()
 
-        cursor.execute('SELECT pdf_name FROM uploaded_files')
-        pdf_list = cursor.fetchall()
-        pdf_list = [pdf[0] for pdf in pdf_list]
+        keyset, params = '', [end_date, start_date]
+        if after:
+            keyset = SEARCH_KEYSET
+            params += [after[0], after[0], after[1], after[1], after[2]]
+        index = choose_search_index(cursor, start_date)
+        cursor.execute(SEARCH_QUERY.format(index=index, keyset=keyset), params + [page_size + 1])
+        results = cursor.fetchall()
+
+        next_cursor = None
+        if len(results) > page_size:
+            last_id, _, last_d1, last_d2 = results[page_size - 1]
+            next_cursor = format_search_cursor(last_d1, last_d2, last_id)
+        filtered_results = [{'id': result[0], 'pdf_name': result[1], 'd1': result[2], 'd2': result[3]}
+                            for result in results[:page_size]]
+
+        search_cache_put(cache_key, filtered_results, next_cursor, generation)
+        return filtered_results, next_cursor
+    finally:
+        if cursor:
+            cursor.close()  # Fecha o cursor
+        if connection:
+            connection.close()  # Devolve a conexão ao pool
 
+# Função para montar a consulta em BOOLEAN MODE: todos os termos são obrigatórios e "frases entre aspas" são buscadas inteiras
+# Retorna a consulta e o primeiro termo (usado para posicionar o trecho exibido)
+def build_fulltext_query(query):
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', normalize_text(query)):
+        words = re.findall(r'\w+', phrase or word)  # Descarta os operadores do BOOLEAN MODE digitados pelo usuário
+        if not words:
+            continue
+        terms.append(' '.join(words))
+    boolean_query = ' '.join(f'+"{term}"' if ' ' in term else f'+{term}' for term in terms)
+    return boolean_query, (terms[0] if terms else None)
+
+# Função para buscar documentos por palavras ou frases no texto extraído, ordenados por relevância
+# Erros do banco são repassados a quem chamou, para não serem confundidos com uma busca sem resultados.
+@SEARCH_SECONDS.labels('text').time()
+def search_text(query, limit=None):
+    limit = max(1, min(limit or TEXT_SEARCH_LIMIT, TEXT_SEARCH_MAX_LIMIT))
+    boolean_query, first_term = build_fulltext_query(query)
+    if not boolean_query:
+        return []
+    connection = cursor = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor(dictionary=True)
+
+        # A subconsulta escolhe os documentos mais relevantes usando só o índice FULLTEXT;
+        # o trecho é recortado no MySQL apenas para essas linhas, sem trazer o LONGTEXT para o Python
+        cursor.execute('''
+            SELECT ranked.pdf_id AS id, t.pdf_name, t.d1, t.d2, ranked.score,
+                   SUBSTRING(s.content, GREATEST(LOCATE(%s, s.content) - %s, 1), %s) AS snippet
+            FROM (
+                SELECT pdf_id, MATCH(content) AGAINST (%s IN BOOLEAN MODE) AS score
+                FROM pdf_search
+                WHERE MATCH(content) AGAINST (%s IN BOOLEAN MODE)
+                ORDER BY score DESC
+                LIMIT %s
+            ) AS ranked
+            JOIN pdf_search s ON s.pdf_id = ranked.pdf_id
+            JOIN pdf_text t ON t.id = ranked.pdf_id
+            ORDER BY ranked.score DESC
+        ''', (first_term, SNIPPET_LENGTH // 3, SNIPPET_LENGTH, boolean_query, boolean_query, limit))
+        return cursor.fetchall()
+    finally:
+        if cursor:
+            cursor.close()  # Fecha o cursor
+        if connection:
+            connection.close()  # Devolve a conexão ao pool
+
+# Comando de migração: indexa na busca textual os documentos gravados antes da tabela pdf_search existir
+# (em bancos antigos, rode antes o "flask compress-text" para mover os textos para pdf_text_body)
+@app.cli.command('index-text')
+def index_text_command(batch_size=500):
+    connection = get_connection()
+    cursor = connection.cursor()
+    indexed = 0
+    try:
+        while True:
+            cursor.execute('''
+                SELECT b.pdf_id, b.body
+                FROM pdf_text_body b
+                LEFT JOIN pdf_search s ON s.pdf_id = b.pdf_id
+                WHERE s.pdf_id IS NULL
+                ORDER BY b.pdf_id
+                LIMIT %s
+            ''', (batch_size,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                'INSERT INTO pdf_search (pdf_id, content) VALUES (%s, %s)',
+                [(pdf_id, normalize_text(decompress_text(body))) for pdf_id, body in rows],
+            )
+            connection.commit()
+            indexed += len(rows)
+    finally:
+        cursor.close()
+        connection.close()
+    print(f'{indexed} documento(s) indexado(s) na busca textual.')
+
+# Função para obter os metadados de um documento (sem o texto)
+def get_document(pdf_id):
+    connection = get_connection()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute('SELECT id, pdf_name, d1, d2, file_hash FROM pdf_text WHERE id = %s', (pdf_id,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+        connection.close()
+
+# Função para obter o texto completo de um documento (descompactado apenas quando o documento é aberto)
+def get_document_text(pdf_id):
+    connection = get_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT body FROM pdf_text_body WHERE pdf_id = %s', (pdf_id,))
+        row = cursor.fetchone()
+        return decompress_text(row[0]) if row else None
+    finally:
+        cursor.close()
+        connection.close()
+
+# Comando de migração: move o texto das linhas antigas de pdf_text.text para pdf_text_body, compactado
+@app.cli.command('compress-text')
+@click.option('--batch-size', default=500, show_default=True, help='Linhas migradas por transação.')
+@click.option('--drop-column', is_flag=True, help='Remove a coluna pdf_text.text ao final (reconstrói a tabela).')
+def compress_text_command(batch_size, drop_column):
+    connection = get_connection()
+    cursor = connection.cursor()
+    migrated = 0
+    try:
+        cursor.execute('''
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'pdf_text' AND COLUMN_NAME = 'text'
+        ''')
+        if cursor.fetchone()[0] == 0:
+            print('A coluna pdf_text.text não existe; nada a migrar.')
+            return
+
+        # Avança pela chave primária a partir do último id migrado, para que cada lote não volte a varrer
+        # as linhas já migradas (text NULL) do início da tabela
+        last_id = 0
+        while True:
+            cursor.execute('''
+                SELECT id, text FROM pdf_text
+                WHERE id > %s AND text IS NOT NULL
+                ORDER BY id
+                LIMIT %s
+            ''', (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            cursor.executemany(
+                'INSERT IGNORE INTO pdf_text_body (pdf_id, body) VALUES (%s, %s)',
+                [(pdf_id, compress_text(text)) for pdf_id, text in rows],
+            )
+            placeholders = ', '.join(['%s'] * len(rows))
+            cursor.execute(f'UPDATE pdf_text SET text = NULL WHERE id IN ({placeholders})', [row[0] for row in rows])
+            connection.commit()
+            migrated += len(rows)
+            print(f'{migrated} texto(s) compactado(s)...')
+
+        if drop_column:
+            cursor.execute('ALTER TABLE pdf_text DROP COLUMN text')
+    finally:
+        cursor.close()
+        connection.close()
+    print(f'{migrated} texto(s) movido(s) para pdf_text_body.')
+
+# Função para incrementar um contador do cache de OCR
+def _count_ocr_cache(counter, amount=1):
+    OCR_CACHE_EVENTS.labels(counter).inc(amount)
+
+# Perfil de OCR gravado junto de cada entrada do cache; textos extraídos com outro perfil não são reaproveitados
+def ocr_profile_key(profile=None):
+    return json.dumps(profile or OCR_PROFILE, sort_keys=True)
+
+# Função para buscar no cache o texto de OCR de um arquivo já processado (pelo hash dos bytes do PDF)
+def ocr_cache_get(file_hash):
+    if OCR_CACHE_MAX_MB <= 0 or not file_hash:
+        return None
+    connection = get_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT text FROM ocr_cache WHERE file_hash = %s AND ocr_profile = %s', (file_hash, ocr_profile_key()))
+        row = cursor.fetchone()
+        if row is None:
+            _count_ocr_cache('misses')
+            return None
+        cursor.execute('UPDATE ocr_cache SET last_used_at = NOW(6) WHERE file_hash = %s', (file_hash,))
+        connection.commit()
+        _count_ocr_cache('hits')
+        return row[0]
+    finally:
         cursor.close()
         connection.close()
+
+# Função para guardar o texto de OCR no cache, removendo as entradas menos usadas quando passa do limite
+def ocr_cache_put(file_hash, text):
+    if OCR_CACHE_MAX_MB <= 0 or not file_hash:
+        return
+    size_bytes = len(text.encode('utf-8'))
+    max_bytes = OCR_CACHE_MAX_MB * 1024 * 1024
+    connection = get_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO ocr_cache (file_hash, text, ocr_profile, size_bytes, last_used_at)
+            VALUES (%s, %s, %s, %s, NOW(6))
+            ON DUPLICATE KEY UPDATE text = VALUES(text), ocr_profile = VALUES(ocr_profile),
+                                    size_bytes = VALUES(size_bytes), last_used_at = NOW(6)
+        ''', (file_hash, text, ocr_profile_key(), size_bytes))
+
+        cursor.execute('SELECT COALESCE(SUM(size_bytes), 0) FROM ocr_cache')
+        excess = int(cursor.fetchone()[0]) - max_bytes
+        if excess > 0:
+            # Remove as entradas usadas há mais tempo (LRU) até liberar o excesso
+            cursor.execute('SELECT file_hash, size_bytes FROM ocr_cache ORDER BY last_used_at LIMIT 1000')
+            evicted = []
+            for cached_hash, cached_size in cursor.fetchall():
+                if excess <= 0:
+                    break
+                evicted.append(cached_hash)
+                excess -= cached_size
+            if evicted:
+                placeholders = ', '.join(['%s'] * len(evicted))
+                cursor.execute(f'DELETE FROM ocr_cache WHERE file_hash IN ({placeholders})', evicted)
+                _count_ocr_cache('evictions', len(evicted))
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+
+# Função para obter o texto de um PDF: usa o cache quando o mesmo arquivo já foi processado, senão faz o OCR
+def extract_text(file_path, file_hash=None, page_metrics=None):
+    try:
+        cached_text = ocr_cache_get(file_hash)
+    except mysql.connector.Error as err:
+        print(f"Erro: {err}")
+        cached_text = None
+    if cached_text is not None:
+        return cached_text
+
+    extracted_text = process_pdf(file_path, page_metrics=page_metrics)
+    try:
+        ocr_cache_put(file_hash, extracted_text)
     except mysql.connector.Error as err:
         print(f"Erro: {err}")
+    return extracted_text
+
+# Função para registrar um arquivo enviado na fila de processamento
+def enqueue_job(pdf_name, file_path, file_hash=None):
+    connection = get_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO ingest_jobs (pdf_name, file_path, file_hash, host)
+            VALUES (%s, %s, %s, %s)
+        ''', (pdf_name, file_path, file_hash, WORKER_HOST))
+        connection.commit()
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+        connection.close()
+
+# Função para reservar o próximo job pendente deste host (SKIP LOCKED evita que dois workers peguem o mesmo job)
+def claim_job():
+    connection = get_connection()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute('''
+            SELECT id, pdf_name, file_path, file_hash
+            FROM ingest_jobs
+            WHERE host = %s
+              AND (status = 'queued'
+                   OR (status = 'processing' AND updated_at < NOW() - INTERVAL %s SECOND))
+            ORDER BY id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        ''', (WORKER_HOST, JOB_STALE_SECONDS))
+        job = cursor.fetchone()
+        if job:
+            cursor.execute("UPDATE ingest_jobs SET status = 'processing' WHERE id = %s", (job['id'],))
+        connection.commit()
+        return job
+    finally:
+        cursor.close()
+        connection.close()
+
+# Função para registrar o resultado do processamento de um job
+def finish_job(job_id, status, message, warning=None, page_metrics=None):
+    connection = get_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute('''
+            UPDATE ingest_jobs SET status = %s, message = %s, warning = %s, page_metrics = %s
+            WHERE id = %s
+        ''', (status, message, warning, json.dumps(page_metrics) if page_metrics else None, job_id))
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+
+# Função para consultar a situação de um job
+def get_job(job_id):
+    return get_jobs([job_id]).get(job_id)
+
+# Função para consultar a situação de vários jobs em uma única consulta; retorna um dicionário id -> job
+# Erros do banco são repassados a quem chamou, para que os jobs não sejam informados como inexistentes
+def get_jobs(job_ids):
+    if not job_ids:
+        return {}
+    connection = cursor = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor(dictionary=True)
+
+        placeholders = ', '.join(['%s'] * len(job_ids))
+        cursor.execute(f'''
+            SELECT id, pdf_name, status, message, warning, page_metrics, created_at, updated_at
+            FROM ingest_jobs
+            WHERE id IN ({placeholders})
+        ''', list(job_ids))
+        jobs = {}
+        for job in cursor.fetchall():
+            if job['page_metrics']:
+                job['page_metrics'] = json.loads(job['page_metrics'])
+            jobs[job['id']] = job
+        return jobs
+    finally:
+        if cursor:
+            cursor.close()  # Fecha o cursor
+        if connection:
+            connection.close()  # Devolve a conexão ao pool
+
+# Função que executa o OCR, a extração de datas e a gravação de um job; retorna (status, mensagem, aviso)
+def process_job(job, page_metrics=None):
+    filename = job['pdf_name']
+    # O texto (e o text_hash) muda com o perfil de OCR, então um PDF já gravado com outro perfil não seria
+    # reconhecido pelo text_hash: compara antes os bytes do arquivo com os já gravados
+    if job['file_hash'] and existing_file_hashes([job['file_hash']]):
+        DEDUPE_HITS.labels('file').inc()
+        return 'duplicate', f'Este arquivo {filename} já está no banco de dados. Pode seguir com o relatório', None
+    if MAX_UPLOAD_PAGES and pdfinfo_from_path(job['file_path'])['Pages'] > MAX_UPLOAD_PAGES:
+        return 'failed', f'O arquivo {filename} tem mais de {MAX_UPLOAD_PAGES} páginas.', None
+    extracted_text = extract_text(job['file_path'], job['file_hash'], page_metrics)  # Processa o PDF (ou reaproveita o OCR em cache)
+    text_hash = calculate_hash(extracted_text)  # Calcula o hash do texto
+
+    start_date, end_date = extract_dates(extracted_text)  # Extrai as datas do texto
+    if not start_date and not end_date:
+        return 'warning', None, f'Não foi possível extrair datas do PDF: {filename}. Salvando sem datas.'
+    if save_to_mysql(extracted_text, text_hash, start_date, end_date, filename, job['file_hash']):
+        return 'done', f'Arquivo {filename} enviado e processado com sucesso', None
+    return 'duplicate', f'Este arquivo {filename} já está no banco de dados. Pode seguir com o relatório', None
+
+# Laço de um worker: consome a fila até que stop_event seja sinalizado
+def run_worker(stop_event=None):
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            job = claim_job()
+        except mysql.connector.Error as err:
+            print(f"Erro: {err}")
+            stop_event.wait(JOB_POLL_INTERVAL)
+            continue
+
+        if not job:
+            stop_event.wait(JOB_POLL_INTERVAL)
+            continue
+
+        page_metrics = []  # Caminho (camada de texto ou OCR) usado em cada página
+        try:
+            with UPLOADS_IN_FLIGHT.track_inprogress():
+                status, message, warning = process_job(job, page_metrics)
+        except Exception as e:
+            print(f"Erro ao processar o job {job['id']}: {e}")
+            status, message, warning = 'failed', f'Erro ao processar o arquivo {job["pdf_name"]}: {e}', None
+
+        try:
+            finish_job(job['id'], status, message, warning, page_metrics)
+        except mysql.connector.Error as err:
+            print(f"Erro: {err}")
+
+        # Remove o arquivo processado para não encher o volume emptyDir do pod
+        try:
+            os.remove(job['file_path'])
+        except OSError:
+            pass
+
+# Inicia as threads de OCR em segundo plano dentro do processo da aplicação
+def start_ingest_workers(count=None, stop_event=None):
+    count = INGEST_WORKER_THREADS if count is None else count
+    threads = []
+    for number in range(count):
+        thread = threading.Thread(target=run_worker, args=(stop_event,), name=f'ingest-worker-{number}', daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+# Função para enfileirar os arquivos de um upload; arquivos sem nome ou com extensão não permitida são descartados
+# Retorna (nome, id do job) para cada arquivo aceito, com id None quando não foi possível enfileirá-lo
+def enqueue_uploads(files):
+    queued = []
+    for file in files:
+        upload = file.stream  # UploadStream: o arquivo já foi gravado no diretório de uploads durante a leitura
+        if file.filename == '' or not allowed_file(file.filename):
+            upload.discard()
+            continue
+
+        filename = secure_filename(file.filename)  # Garante que o nome do arquivo é seguro
+        upload.close()
+        try:
+            job_id = enqueue_job(filename, upload.path, upload.hexdigest())  # O OCR é feito em segundo plano pelos workers
+        except mysql.connector.Error as err:
+            print(f"Erro: {err}")
+            upload.discard()
+            job_id = None
+        else:
+            upload.kept = True
+        queued.append((filename, job_id))
+    return queued
+
+# Rota principal da aplicação (exibe a página inicial e lida com uploads e buscas)
+@app.route('/', methods=['GET', 'POST'])
+def index():
+    results = []
+    next_cursor = None
+    selected_start_date = None
+    selected_end_date = None
 
     if request.method == 'POST':
         if 'file' in request.files:
@@ -195,26 +1403,11 @@ def index():
                 flash('Nenhum arquivo selecionado')
                 return redirect(request.url)
             
-            for file in files:
-                if file.filename == '':
+            for filename, job_id in enqueue_uploads(files):
+                if job_id is None:
+                    flash(f'Não foi possível enfileirar o arquivo {filename}. Tente novamente.', 'error')
                     continue
-                
-                if file and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)  # Garante que o nome do arquivo é seguro
-                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    file.save(file_path)  # Salva o arquivo no diretório de uploads
-
-                    extracted_text = process_pdf(file_path)  # Processa o PDF e extrai o texto
-                    text_hash = calculate_hash(extracted_text)  # Calcula o hash do texto
-
-                    start_date, end_date = extract_dates(extracted_text)  # Extrai as datas do texto
-                    if not start_date and not end_date:
-                        flash(f'Não foi possível extrair datas do PDF: {filename}. Salvando sem datas.', 'warning')
-                    else:
-                        if save_to_mysql(extracted_text, text_hash, start_date, end_date, filename):
-                            flash(f'Arquivo {filename} enviado e processado com sucesso', 'success')
-                        else:
-                            flash(f'Este arquivo {filename} já está no banco de dados. Pode seguir com o relatório', 'error')
+                flash(f'Arquivo {filename} recebido e aguardando processamento (job {job_id}: {url_for("job_status", job_id=job_id)})', 'info')
         
         elif 'start_date' in request.form and 'end_date' in request.form:
             selected_start_date_str = request.form.get('start_date')
@@ -235,13 +1428,247 @@ def index():
                 flash('A data final deve ser após a data inicial.', 'error')
                 return redirect(url_for('index'))
 
-            results = search_reports(selected_start_date, selected_end_date)  # Busca relatórios dentro do intervalo de datas
+            try:
+                after = parse_search_cursor(request.form.get('cursor'))
+                page_size = int(request.form.get('page_size') or SEARCH_PAGE_SIZE)
+            except ValueError:
+                after, page_size = None, SEARCH_PAGE_SIZE
+
+            # Busca uma página de relatórios dentro do intervalo de datas
+            try:
+                results, next_cursor = search_reports(selected_start_date, selected_end_date, after, page_size)
+            except mysql.connector.Error as err:
+                print(f"Erro: {err}")
+                flash('Não foi possível consultar os relatórios. Tente novamente.', 'error')
+                return redirect(url_for('index'))
 
             if not results:
                 flash('Nenhum relatório encontrado para o intervalo de datas selecionado.', 'info')
 
-    return render_template('index.html', results=results, selected_start_date=selected_start_date, selected_end_date=selected_end_date, pdf_list=pdf_list)
+    return render_template('index.html', results=results, next_cursor=next_cursor, selected_start_date=selected_start_date, selected_end_date=selected_end_date, files_total=count_uploaded_files())
+
+# Rota da listagem paginada dos arquivos enviados (JSON): /files?cursor=<id>&limit=100
+@app.route('/files')
+def files_list():
+    files, next_cursor = list_uploaded_files(request.args.get('cursor', 0, type=int), request.args.get('limit', type=int))
+    return jsonify({'files': files, 'next_cursor': next_cursor, 'total': count_uploaded_files()})
+
+# Rota com o trecho de HTML de uma página da listagem, carregado aos poucos pela página inicial
+@app.route('/files/fragment')
+def files_fragment():
+    files, next_cursor = list_uploaded_files(request.args.get('cursor', 0, type=int), request.args.get('limit', type=int))
+    return render_template('_file_list.html', files=files, next_cursor=next_cursor)
+
+# Rota que abre o texto completo de um documento
+@app.route('/documents/<int:pdf_id>/text')
+def document_text(pdf_id):
+    text = get_document_text(pdf_id)
+    if text is None:
+        abort(404)
+    return text, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+# Upload acima de MAX_CONTENT_LENGTH (ou de MAX_UPLOAD_PAGES páginas): avisa o usuário na página inicial
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    if request.path.startswith('/api/'):
+        return jsonify({'error': f'Arquivo recusado: o limite é de {limit_mb} MB e {MAX_UPLOAD_PAGES} páginas por envio.'}), 413
+    flash(f'Arquivo recusado: o limite é de {limit_mb} MB e {MAX_UPLOAD_PAGES} páginas por envio.', 'error')
+    return redirect(url_for('index'))
+
+# Rota para consultar a situação de um upload enfileirado
+@app.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    try:
+        job = get_job(job_id)
+    except mysql.connector.Error as err:
+        print(f"Erro: {err}")
+        return jsonify({'error': 'Não foi possível consultar o job.'}), 503
+    if not job:
+        abort(404)
+    return jsonify(job)
+
+# Rota de busca textual: /search/text?q=palavra "frase exata"&limit=20
+@app.route('/search/text')
+def text_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Informe o parâmetro q.'}), 400
+    limit = request.args.get('limit', TEXT_SEARCH_LIMIT, type=int)
+    try:
+        results = search_text(query, limit)
+    except mysql.connector.Error as err:
+        print(f"Erro: {err}")
+        return jsonify({'error': 'Não foi possível consultar a busca textual.'}), 503
+    return jsonify({'query': query, 'results': results})
+
+# Função para ler os valores de um contador Prometheus por rótulo; com PROMETHEUS_MULTIPROC_DIR, soma os valores
+# gravados por todos os processos (web e worker.py), senão usa os do próprio processo
+def counter_values(counter, label):
+    collector = multiprocess.MultiProcessCollector(None) if 'PROMETHEUS_MULTIPROC_DIR' in os.environ else counter
+    values = {}
+    for family in collector.collect():
+        for sample in family.samples:
+            if sample.name == f'{family.name}_total' and family.name == counter._name:
+                values[sample.labels[label]] = values.get(sample.labels[label], 0) + int(sample.value)
+    return values
+
+# Rota com os contadores do cache de OCR (somados entre os processos, ver counter_values)
+@app.route('/ocr-cache/stats')
+def ocr_cache_status():
+    events = counter_values(OCR_CACHE_EVENTS, 'event')
+    stats = {event: events.get(event, 0) for event in ('hits', 'misses', 'evictions')}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return jsonify(stats)
+
+# Rota com os contadores do cache da busca por datas
+@app.route('/search-cache/stats')
+def search_cache_status():
+    events = counter_values(SEARCH_CACHE_EVENTS, 'event')
+    stats = {event: events.get(event, 0) for event in ('hits', 'misses', 'invalidations', 'evictions')}
+    with _search_cache_lock:
+        stats['process_entries'] = len(_search_cache)  # Entradas do cache do processo que respondeu
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return jsonify(stats)
+
+# Função para converter as datas de um registro para o formato ISO (aaaa-mm-dd) usado pela API
+def iso_dates(row):
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else value for key, value in row.items()}
+
+# Função para responder JSON com ETag: o cliente que reenviar o ETag em If-None-Match recebe 304 sem corpo
+def conditional_json(payload, max_age=0):
+    response = jsonify(payload)
+    response.add_etag()
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True  # O cliente pode guardar a resposta, mas revalida antes de usá-la
+    return response.make_conditional(request)
+
+# API de busca por datas: /api/search?start=2023-01-01&end=2023-12-31&cursor=<next_cursor>&page_size=50
+@app.route('/api/search')
+def api_search():
+    try:
+        start_date = datetime.strptime(request.args.get('start', ''), '%Y-%m-%d')
+        end_date = datetime.strptime(request.args.get('end', ''), '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'Informe start e end no formato aaaa-mm-dd.'}), 400
+    if end_date < start_date:
+        return jsonify({'error': 'A data final deve ser após a data inicial.'}), 400
+    try:
+        after = parse_search_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Cursor inválido: use o next_cursor da página anterior.'}), 400
+
+    try:
+        results, next_cursor = search_reports(start_date, end_date, after, request.args.get('page_size', type=int))
+    except mysql.connector.Error as err:
+        print(f"Erro: {err}")
+        return jsonify({'error': 'Não foi possível consultar os relatórios.'}), 503
+    return conditional_json({
+        'start': start_date.date().isoformat(),
+        'end': end_date.date().isoformat(),
+        'results': [iso_dates(result) for result in results],
+        'next_cursor': next_cursor,
+    }, API_SEARCH_MAX_AGE)
+
+# API com os metadados de um documento
+@app.route('/api/documents/<int:pdf_id>')
+def api_document(pdf_id):
+    try:
+        document = get_document(pdf_id)
+    except mysql.connector.Error as err:
+        print(f"Erro: {err}")
+        return jsonify({'error': 'Não foi possível consultar o documento.'}), 503
+    if not document:
+        return jsonify({'error': 'Documento não encontrado.'}), 404
+    document = iso_dates(document)
+    document['text_url'] = url_for('document_text', pdf_id=pdf_id)
+    return conditional_json(document)
+
+# API com a situação de vários uploads de uma vez: /api/jobs?ids=1,2,3
+@app.route('/api/jobs')
+def api_jobs():
+    try:
+        job_ids = list(dict.fromkeys(int(job_id) for job_id in request.args.get('ids', '').split(',') if job_id.strip()))
+    except ValueError:
+        return jsonify({'error': 'Informe ids como uma lista de números separados por vírgula.'}), 400
+    if not job_ids or len(job_ids) > API_JOBS_MAX_IDS:
+        return jsonify({'error': f'Informe de 1 a {API_JOBS_MAX_IDS} ids.'}), 400
+
+    try:
+        jobs = get_jobs(job_ids)
+    except mysql.connector.Error as err:
+        print(f"Erro: {err}")
+        return jsonify({'error': 'Não foi possível consultar os jobs.'}), 503
+    return conditional_json({
+        'jobs': [iso_dates(jobs[job_id]) for job_id in job_ids if job_id in jobs],
+        'missing': [job_id for job_id in job_ids if job_id not in jobs],
+    })
+
+# API de upload: recebe um ou mais PDFs no campo "file" e devolve os jobs criados (202)
+@app.route('/api/uploads', methods=['POST'])
+def api_uploads():
+    files = request.files.getlist('file')
+    if not files:
+        return jsonify({'error': 'Envie os PDFs no campo file.'}), 400
+
+    jobs, failed = [], []
+    for filename, job_id in enqueue_uploads(files):
+        if job_id is None:
+            failed.append(filename)
+            continue
+        jobs.append({'id': job_id, 'pdf_name': filename, 'status_url': url_for('job_status', job_id=job_id)})
+    if not jobs:
+        return jsonify({'error': 'Nenhum arquivo PDF foi enfileirado.', 'failed': failed}), 503 if failed else 400
+    return jsonify({'jobs': jobs, 'failed': failed}), 202
+
+# Coletor com o tamanho da fila de uploads por situação, lido do banco a cada coleta do /metrics
+class IngestQueueCollector:
+    def describe(self):
+        return [GaugeMetricFamily('atestados_ingest_jobs', 'Jobs na fila de uploads, por situação', labels=['status'])]
+
+    def collect(self):
+        metric = GaugeMetricFamily('atestados_ingest_jobs', 'Jobs na fila de uploads, por situação', labels=['status'])
+        connection = cursor = None
+        try:
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute("SELECT status, COUNT(*) FROM ingest_jobs WHERE status IN ('queued', 'processing') GROUP BY status")
+            counts = dict(cursor.fetchall())
+        except mysql.connector.Error as err:
+            print(f"Erro: {err}")
+            return
+        finally:
+            if cursor:
+                cursor.close()  # Fecha o cursor
+            if connection:
+                connection.close()  # Devolve a conexão ao pool
+        for status in ('queued', 'processing'):
+            metric.add_metric([status], counts.get(status, 0))
+        yield metric
+
+_ingest_queue_collector = IngestQueueCollector()
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    REGISTRY.register(_ingest_queue_collector)
+
+# Rota com as métricas no formato do Prometheus
+@app.route('/metrics')
+def metrics():
+    registry = REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # Agrega os arquivos de métricas de todos os processos (web e workers) gravados no diretório compartilhado
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_ingest_queue_collector)
+    return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
 # Inicia a aplicação Flask
 if __name__ == '__main__':
+    # Com o reloader do modo debug, apenas o processo filho (WERKZEUG_RUN_MAIN) inicia os workers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        init_schema()
+        start_ingest_workers()
     app.run(host='0.0.0.0', port=5000, debug=True)
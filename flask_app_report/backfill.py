@@ -0,0 +1,145 @@
+# Reprocessamento em massa das datas (d1/d2) da tabela pdf_text
+#
+# Lê as linhas em ordem de id com um cursor não bufferizado (as linhas são transferidas aos poucos),
+# extrai as datas em paralelo em todos os núcleos e grava as alterações em lotes com executemany.
+# O último id gravado fica em um arquivo de checkpoint, permitindo retomar de onde parou.
+#
+# Uso: python backfill.py [--checkpoint backfill.checkpoint] [--start-id N] [--batch-size 1000] [--workers N]
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import mysql.connector
+
+import app
+
+
+# Função executada nos processos do pool: devolve (d1, d2, id) apenas das linhas cujas datas mudaram
+def extract_batch(rows):
+    # O texto chega compactado (pdf_text_body) e só é descompactado aqui, dentro do processo do pool; linhas
+    # ainda não migradas pelo compress-text trazem o texto da coluna antiga. Linhas sem texto nenhum ficam como
+    # estão, em vez de terem d1/d2 apagados
+    with_text = [row for row in rows if row[1] is not None or row[2] is not None]
+    dates = app.extract_dates_many([app.decompress_text(body) if body is not None else text
+                                    for _, body, text, _, _ in with_text])
+    changes = []
+    for (row_id, _, _, old_d1, old_d2), (d1, d2) in zip(with_text, dates):
+        if (d1, d2) != (old_d1 and old_d1.isoformat(), old_d2 and old_d2.isoformat()):
+            changes.append((d1, d2, row_id))
+    return rows[-1][0], len(rows), changes
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as checkpoint:
+            return int(checkpoint.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, last_id):
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w') as checkpoint:
+        checkpoint.write(str(last_id))
+    os.replace(temporary_path, path)  # Troca atômica: o checkpoint nunca fica pela metade
+
+
+# Função para verificar se a coluna antiga pdf_text.text ainda existe (compress-text sem --drop-column)
+def has_legacy_text(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute('''
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'pdf_text' AND COLUMN_NAME = 'text'
+        ''')
+        return cursor.fetchone()[0] > 0
+    finally:
+        cursor.close()
+
+
+# Gera lotes de linhas (id, texto compactado, texto antigo, d1, d2) lidas em streaming a partir do id informado
+def stream_batches(connection, start_id, batch_size):
+    legacy_text = 't.text' if has_legacy_text(connection) else 'NULL'
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute(f'''
+            SELECT t.id, b.body, {legacy_text}, t.d1, t.d2
+            FROM pdf_text t
+            LEFT JOIN pdf_text_body b ON b.pdf_id = t.id
+            WHERE t.id > %s
+            ORDER BY t.id
+        ''', (start_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reprocessa as datas d1/d2 da tabela pdf_text')
+    parser.add_argument('--checkpoint', default='backfill.checkpoint', help='arquivo com o último id processado')
+    parser.add_argument('--start-id', type=int, help='processa a partir deste id (ignora o checkpoint)')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--dry-run', action='store_true', help='não grava as alterações no banco')
+    args = parser.parse_args()
+
+    start_id = args.start_id if args.start_id is not None else read_checkpoint(args.checkpoint)
+    print(f'Reprocessando pdf_text a partir do id {start_id} com {args.workers} processo(s)', file=sys.stderr)
+
+    # Conexões separadas: a de leitura fica ocupada com o resultado em streaming enquanto a outra grava
+    reader = mysql.connector.connect(**app.db_config)
+    writer = mysql.connector.connect(**app.db_config)
+    writer_cursor = writer.cursor()
+
+    processed = updated = 0
+    started = last_report = time.monotonic()
+    pending = deque()
+
+    def flush_oldest():
+        nonlocal processed, updated, last_report
+        last_id, count, changes = pending.popleft().result()
+        if changes and not args.dry_run:
+            writer_cursor.executemany('UPDATE pdf_text SET d1 = %s, d2 = %s WHERE id = %s', changes)
+            # Na mesma transação: os caches da busca das réplicas descartam os resultados com as datas antigas
+            app.bump_search_cache_generation(writer_cursor)
+            writer.commit()
+        if not args.dry_run:
+            write_checkpoint(args.checkpoint, last_id)
+        processed += count
+        updated += len(changes)
+
+        now = time.monotonic()
+        if now - last_report >= 5:
+            last_report = now
+            print(f'{processed} linhas ({processed / (now - started):.0f} linhas/s), '
+                  f'{updated} atualizadas, último id {last_id}', file=sys.stderr)
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for rows in stream_batches(reader, start_id, args.batch_size):
+                pending.append(executor.submit(extract_batch, rows))
+                # Limita os lotes em andamento para não acumular a tabela inteira em memória;
+                # os resultados são gravados em ordem de id para que o checkpoint seja contínuo
+                while len(pending) > args.workers * 2:
+                    flush_oldest()
+            while pending:
+                flush_oldest()
+    finally:
+        writer_cursor.close()
+        writer.close()
+        reader.close()
+
+    elapsed = time.monotonic() - started
+    print(f'Concluído: {processed} linhas em {elapsed:.1f} s ({processed / elapsed if elapsed else 0:.0f} linhas/s), '
+          f'{updated} atualizadas', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
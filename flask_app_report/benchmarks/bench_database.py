@@ -0,0 +1,21 @@
+# Banco de dados dos benchmarks que gravam no MySQL
+#
+# Cada benchmark usa um banco próprio (criado se não existir) para não tocar nos dados reais nem nos dos outros
+# benchmarks, que semeiam e alteram as tabelas de formas diferentes. BENCH_DATABASE sobrescreve o nome.
+import os
+
+import mysql.connector
+
+
+# Escolhe o banco do benchmark; chamada antes de importar o app, que lê MYSQL_DATABASE na importação
+def use_database(default):
+    os.environ['MYSQL_DATABASE'] = os.environ.get('BENCH_DATABASE', default)
+
+
+def create_database(app):
+    config = dict(app.db_config, database=None)
+    connection = mysql.connector.connect(**config)
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {app.db_config['database']}")
+    cursor.close()
+    connection.close()
@@ -0,0 +1,142 @@
+# Benchmark: vazão da extração de datas (implementação anterior x extrator pré-compilado x API em lote)
+#
+# Antes de medir, confere que o extrator produz exatamente as mesmas datas que a implementação anterior
+# no corpus de referência (data/dates_golden.json) e em um corpus sintético.
+#
+# Uso: python benchmarks/bench_extract_dates.py [--docs 20000] [--regenerate-golden]
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import unidecode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.gettempdir())
+
+import app  # noqa: E402
+from synthetic import WORDS  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'dates_golden.json')
+
+
+# Implementação anterior de extract_dates (referência para o corpus)
+def legacy_extract_dates(text):
+    normalized_text = unidecode.unidecode(text)
+    patterns = [
+        r'Data\s*de\s*inicio\s*[:\s]*(\d{2}/\d{2}/\d{4})',
+        r'Conclusao\s*Efetiva\s*[:\s]*(\d{2}/\d{2}/\d{4})'
+    ]
+    regex = re.compile('|'.join(patterns), re.IGNORECASE)
+    matches = regex.findall(normalized_text)
+    start_date, end_date = None, None
+    if matches:
+        try:
+            if len(matches) > 0:
+                start_date = datetime.strptime(matches[0][0], '%d/%m/%Y').strftime('%Y-%m-%d')
+            if len(matches) > 1:
+                end_date = datetime.strptime(matches[1][0], '%d/%m/%Y').strftime('%Y-%m-%d')
+        except ValueError as e:
+            print(f"Erro: Formato de data incorreto no texto. Exceção: {e}")
+    else:
+        generic_date_pattern = r'\b(\d{2}/\d{2}/\d{4})\b'
+        date_matches = re.findall(generic_date_pattern, normalized_text)
+        if len(date_matches) >= 2:
+            try:
+                start_date = datetime.strptime(date_matches[0], '%d/%m/%Y').strftime('%Y-%m-%d')
+                end_date = datetime.strptime(date_matches[1], '%d/%m/%Y').strftime('%Y-%m-%d')
+            except ValueError as e:
+                print(f"Erro: Formato de data incorreto no texto. Exceção: {e}")
+    if not start_date and not end_date:
+        print("Não foi possível encontrar o padrão de data no texto, salvando sem datas.")
+    return start_date, end_date
+
+
+def synthetic_corpus(docs, seed=1):
+    rng = random.Random(seed)
+    labels = ['Data de início:', 'DATA DE INICIO', 'Data  de\ninício :', 'Conclusão Efetiva:', 'conclusao efetiva',
+              'Vigência:', 'Emitido em', '']
+    corpus = []
+    for _ in range(docs):
+        parts = []
+        for _ in range(rng.randrange(50, 400)):
+            roll = rng.random()
+            if roll < 0.02:
+                day = date(1990, 1, 1) + timedelta(days=rng.randrange(0, 14000))
+                value = f'{day:%d/%m/%Y}' if rng.random() < 0.95 else f'{rng.randrange(0, 40):02d}/{rng.randrange(0, 14):02d}/{rng.randrange(0, 2100):04d}'
+                parts.append(f'{rng.choice(labels)} {value}')
+            else:
+                parts.append(rng.choice(WORDS + ['execução', 'responsável', 'técnica', 'nº']))
+        corpus.append(' '.join(parts))
+    return corpus
+
+
+def quiet(function, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+
+def regenerate_golden():
+    with open(GOLDEN_PATH, encoding='utf-8') as golden_file:
+        cases = json.load(golden_file)
+    for case in cases:
+        case['expected'] = list(quiet(legacy_extract_dates, case['text']))
+    with open(GOLDEN_PATH, 'w', encoding='utf-8') as golden_file:
+        json.dump(cases, golden_file, ensure_ascii=False, indent=2)
+        golden_file.write('\n')
+    print(f'{len(cases)} casos regravados em {GOLDEN_PATH}')
+
+
+def check(texts, expected, label):
+    single = [list(quiet(app.extract_dates, text)) for text in texts]
+    batch = [list(dates) for dates in app.extract_dates_many(texts)]
+    mismatches = [index for index, dates in enumerate(expected) if single[index] != dates or batch[index] != dates]
+    for index in mismatches[:10]:
+        print(f'  divergência: {texts[index][:80]!r}: esperado {expected[index]}, obtido {single[index]} / {batch[index]}')
+    print(f'{label}: {len(texts) - len(mismatches)}/{len(texts)} idênticos')
+    return not mismatches
+
+
+def throughput(function, texts):
+    started = time.perf_counter()
+    quiet(function, texts)
+    return len(texts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vazão e equivalência da extração de datas')
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--regenerate-golden', action='store_true',
+                        help='regrava os resultados esperados do corpus com a implementação anterior')
+    args = parser.parse_args()
+
+    if args.regenerate_golden:
+        regenerate_golden()
+        return
+
+    with open(GOLDEN_PATH, encoding='utf-8') as golden_file:
+        cases = json.load(golden_file)
+    ok = check([case['text'] for case in cases], [case['expected'] for case in cases], 'corpus de referência')
+
+    corpus = synthetic_corpus(args.docs)
+    ok = check(corpus, [list(quiet(legacy_extract_dates, text)) for text in corpus], 'corpus sintético') and ok
+
+    legacy = throughput(lambda texts: [legacy_extract_dates(text) for text in texts], corpus)
+    single = throughput(lambda texts: [app.extract_dates(text) for text in texts], corpus)
+    batch = throughput(app.extract_dates_many, corpus)
+    print(f'anterior:            {legacy:10.0f} textos/s')
+    print(f'extract_dates:       {single:10.0f} textos/s  ({single / legacy:.1f}x)')
+    print(f'extract_dates_many:  {batch:10.0f} textos/s  ({batch / legacy:.1f}x)')
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# Benchmark: vazão (páginas/min) da ingestão em massa sobre PDFs sintéticos
+#
+# Executa ingest.py em modo --dry-run (OCR e extração de datas, sem banco) e compara com a meta informada.
+# Uso: python benchmarks/bench_ingest.py [--files 40] [--pages 5] [--workers N] [--target 120]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from synthetic import make_pdf  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vazão da ingestão em massa')
+    parser.add_argument('--files', type=int, default=40)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--target', type=float, default=120, help='meta de páginas por minuto')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_dir = os.path.join(tmp, 'pdfs')
+        os.makedirs(pdf_dir)
+        for number in range(args.files):
+            make_pdf(os.path.join(pdf_dir, f'atestado-{number:04d}.pdf'), pages=args.pages, seed=number)
+
+        report_path = os.path.join(tmp, 'report.jsonl')
+        env = dict(os.environ, UPLOAD_FOLDER=tmp)
+        started = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(BASE_DIR, 'ingest.py'), pdf_dir, '--dry-run',
+                        '--workers', str(args.workers), '--report', report_path], check=False, env=env)
+        elapsed = time.perf_counter() - started
+
+        with open(report_path, encoding='utf-8') as report:
+            results = [json.loads(line) for line in report]
+
+    pages = sum(result['pages'] for result in results)
+    errors = sum(result['status'] == 'error' for result in results)
+    pages_per_minute = pages / elapsed * 60
+    print(f'arquivos: {args.files}  páginas: {pages}  workers: {args.workers}  erros: {errors}')
+    print(f'tempo: {elapsed:.1f} s  vazão: {pages_per_minute:.0f} páginas/min  (meta: {args.target:.0f})')
+    print('meta atingida' if pages_per_minute >= args.target else 'meta NÃO atingida')
+    if pages_per_minute < args.target or errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Benchmark: pico de memória do OCR em função do número de páginas do PDF
+#
+# Cada medição roda em um processo novo, pois ru_maxrss é o pico acumulado do processo.
+# Compara a rasterização antiga (todas as páginas como imagens PIL) com o pipeline por blocos.
+#
+# Uso: python benchmarks/bench_ocr_memory.py [--pages 5 20 80]
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.gettempdir())
+
+
+# Implementação anterior: converte todas as páginas em memória antes do OCR
+def legacy_process_pdf(pdf_path):
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(pdf_path)
+    extracted_text = []
+    for image in images:
+        text = pytesseract.image_to_string(image, output_type=pytesseract.Output.DICT)
+        extracted_text.append(text['text'])
+    return ' '.join(extracted_text)
+
+
+def child(mode, pdf_path):
+    import app
+
+    tracemalloc.start()
+    if mode == 'legacy':
+        legacy_process_pdf(pdf_path)
+    else:
+        app.process_pdf(pdf_path, workers=1)
+    _, peak = tracemalloc.get_traced_memory()
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'tracemalloc_peak_mb': peak / 2 ** 20, 'max_rss_mb': rss_kb / 1024}))
+
+
+def measure(mode, pdf_path):
+    output = subprocess.check_output([sys.executable, __file__, '--child', mode, pdf_path])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pico de memória do OCR por número de páginas')
+    parser.add_argument('--pages', type=int, nargs='+', default=[5, 20, 80])
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PDF'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    from synthetic import make_pdf
+
+    print(f'{"páginas":>8} {"modo":>8} {"tracemalloc (MB)":>17} {"RSS máx (MB)":>13}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf_path = os.path.join(tmp, f'atestado-{pages}.pdf')
+            make_pdf(pdf_path, pages=pages)
+            for mode in ('legacy', 'stream'):
+                result = measure(mode, pdf_path)
+                print(f'{pages:>8} {mode:>8} {result["tracemalloc_peak_mb"]:>17.1f} {result["max_rss_mb"]:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# Benchmark: OCR serial x OCR paralelo (pool de processos) em um PDF sintético
+#
+# Uso: python benchmarks/bench_ocr_parallel.py [--pages 30] [--workers N]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.gettempdir())
+
+import app  # noqa: E402
+from synthetic import make_pdf  # noqa: E402
+
+
+def timed(pdf_path, workers):
+    started = time.perf_counter()
+    text = app.process_pdf(pdf_path, workers=workers)
+    return time.perf_counter() - started, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCR serial x paralelo')
+    parser.add_argument('--pages', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=app.OCR_WORKERS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, 'atestado.pdf')
+        make_pdf(pdf_path, pages=args.pages)
+
+        serial_time, serial_text = timed(pdf_path, 1)
+        parallel_time, parallel_text = timed(pdf_path, args.workers)
+
+    print(f'páginas: {args.pages}  workers: {args.workers}')
+    print(f'serial:   {serial_time:8.2f} s  ({args.pages / serial_time:.2f} páginas/s)')
+    print(f'paralelo: {parallel_time:8.2f} s  ({args.pages / parallel_time:.2f} páginas/s)')
+    print(f'speedup:  {serial_time / parallel_time:8.2f}x')
+    print(f'texto idêntico: {serial_text == parallel_text}')
+    if serial_text != parallel_text:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Benchmark: velocidade x acerto das datas para cada perfil de OCR (OCR_PROFILES)
+#
+# Por padrão usa um corpus sintético (PDFs só com imagem, datas conhecidas). Para um corpus real,
+# passe um diretório com os PDFs e um expected.json no formato {"arquivo.pdf": ["aaaa-mm-dd", "aaaa-mm-dd"]}.
+# A camada de texto é ignorada, para que todas as páginas passem pelo OCR. Além de d1/d2 como o find_dates
+# os extrai, conta os documentos cujo texto de OCR contém as duas datas esperadas (qualidade do OCR em si).
+#
+# Uso: python benchmarks/bench_ocr_profiles.py [--docs 10] [--pages 2] [--corpus DIR] [--profiles legacy default fast dates]
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.gettempdir())
+
+import app  # noqa: E402
+from synthetic import make_pdf  # noqa: E402
+
+
+def synthetic_corpus(directory, docs, pages):
+    corpus = []
+    for seed in range(docs):
+        path = os.path.join(directory, f'atestado-{seed}.pdf')
+        start, end = make_pdf(path, pages=pages, seed=seed)
+        corpus.append((path, [f'{start:%Y-%m-%d}', f'{end:%Y-%m-%d}']))
+    return corpus
+
+
+def load_corpus(directory):
+    with open(os.path.join(directory, 'expected.json'), encoding='utf-8') as source:
+        expected = json.load(source)
+    return [(os.path.join(directory, name), dates) for name, dates in sorted(expected.items())]
+
+
+def br_dates(text):
+    return {f'{year}-{month}-{day}' for day, month, year in re.findall(r'(\d{2})/(\d{2})/(\d{4})', text)}
+
+
+def run_profile(corpus, profile, workers):
+    pages = d1_correct = d2_correct = in_text = 0
+    started = time.perf_counter()
+    for path, expected in corpus:
+        page_metrics = []
+        text = app.process_pdf(path, workers=workers, page_metrics=page_metrics, profile=profile)
+        pages += len(page_metrics)
+        start_date, end_date, _ = app.find_dates(text)
+        d1_correct += start_date == expected[0]
+        d2_correct += end_date == expected[1]
+        in_text += set(expected) <= br_dates(text)
+    return time.perf_counter() - started, pages, d1_correct, d2_correct, in_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perfis de OCR: velocidade x acerto das datas')
+    parser.add_argument('--docs', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--corpus', help='diretório com os PDFs e o expected.json')
+    parser.add_argument('--profiles', nargs='+', default=list(app.OCR_PROFILES))
+    parser.add_argument('--workers', type=int, default=app.OCR_WORKERS)
+    args = parser.parse_args()
+
+    app.PDF_TEXT_LAYER = False
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(tmp, args.docs, args.pages)
+        print(f'documentos: {len(corpus)}  workers: {args.workers}')
+        print(f'{"perfil":<10} {"tempo (s)":>10} {"páginas/s":>10} {"d1 correta":>11} {"d2 correta":>11} {"datas no texto":>15}')
+        for name in args.profiles:
+            elapsed, pages, d1_correct, d2_correct, in_text = run_profile(corpus, app.OCR_PROFILES[name], args.workers)
+            print(f'{name:<10} {elapsed:10.2f} {pages / elapsed:10.2f} '
+                  f'{d1_correct / len(corpus):11.1%} {d2_correct / len(corpus):11.1%} {in_text / len(corpus):15.1%}')
+
+
+if __name__ == '__main__':
+    main()
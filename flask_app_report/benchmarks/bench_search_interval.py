@@ -0,0 +1,172 @@
+# Benchmark: latência da busca por intervalo de datas antes e depois dos índices (d1, d2)/(d2, d1)
+#
+# Usa o banco atestados_bench_search_interval (ver bench_database.py).
+# Também compara, em intervalos no fim dos dados, a escolha de índice de app.choose_search_index com a leitura
+# sempre pelo (d1, d2), e mostra o EXPLAIN das duas formas da consulta.
+# Uso: MYSQL_HOST=127.0.0.1 python benchmarks/bench_search_interval.py [--rows 1000000] [--queries 200]
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.gettempdir())
+
+from bench_database import create_database, use_database  # noqa: E402
+
+use_database('atestados_bench_search_interval')
+
+import app  # noqa: E402
+
+# Consulta anterior: OR de dois intervalos, sem índices e trazendo a coluna LONGTEXT inteira
+LEGACY_QUERY = '''
+    SELECT text, pdf_name
+    FROM pdf_text
+    WHERE (d1 <= %s AND d2 >= %s) OR (d1 <= %s AND d2 >= %s)
+'''
+
+
+def seed(rows, text_bytes, batch=5000):
+    connection = app.get_connection()
+    cursor = connection.cursor()
+    # Layout anterior: o texto ficava na própria linha de pdf_text (hoje fica compactado em pdf_text_body)
+    app.ensure_column(cursor, 'pdf_text', 'text', 'LONGTEXT AFTER id')
+    cursor.execute('SELECT COUNT(*) FROM pdf_text')
+    existing = cursor.fetchone()[0]
+    rng = random.Random(42)
+    filler = 'x' * text_bytes
+    for offset in range(existing, rows, batch):
+        values = []
+        for number in range(offset, min(offset + batch, rows)):
+            d1 = date(2000, 1, 1) + timedelta(days=rng.randrange(0, 9000))
+            d2 = d1 + timedelta(days=rng.randrange(30, 1500))
+            values.append((filler, f'{number:064x}', d1, d2, f'atestado-{number}.pdf'))
+        cursor.executemany('INSERT INTO pdf_text (text, text_hash, d1, d2, pdf_name) VALUES (%s, %s, %s, %s, %s)', values)
+        connection.commit()
+        print(f'\r{min(offset + batch, rows)} linhas', end='', file=sys.stderr)
+    print(file=sys.stderr)
+    cursor.close()
+    connection.close()
+
+
+def drop_interval_indexes():
+    connection = app.get_connection()
+    cursor = connection.cursor()
+    for table, index, _ in app.SCHEMA_INDEXES:
+        cursor.execute('''
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        ''', (table, index))
+        if cursor.fetchone()[0]:
+            cursor.execute(f'ALTER TABLE {table} DROP INDEX {index}')
+    cursor.close()
+    connection.close()
+
+
+def ranges(queries):
+    rng = random.Random(7)
+    for _ in range(queries):
+        start = date(2000, 1, 1) + timedelta(days=rng.randrange(0, 9000))
+        yield start, start + timedelta(days=rng.choice([30, 90, 365]))
+
+
+# Intervalos que começam no último ano dos dados: poucos documentos terminam depois do início
+def recent_ranges(queries, last_date):
+    rng = random.Random(11)
+    for _ in range(queries):
+        start = last_date - timedelta(days=rng.randrange(0, 365))
+        yield start, start + timedelta(days=30)
+
+
+def legacy_search(start, end):
+    connection = app.get_connection()
+    cursor = connection.cursor()
+    cursor.execute(LEGACY_QUERY, (start, end, end, start))
+    results = [{'pdf_name': row[1]} for row in cursor.fetchall()]
+    cursor.close()
+    connection.close()
+    return results
+
+
+# Primeira página sempre pelo índice (d1, d2), sem a escolha de app.choose_search_index
+def ordered_search(start, end):
+    connection = app.get_connection()
+    cursor = connection.cursor()
+    cursor.execute(app.SEARCH_QUERY.format(index='idx_pdf_text_d1_d2', keyset=''), (end, start, app.SEARCH_PAGE_SIZE + 1))
+    results = cursor.fetchall()
+    cursor.close()
+    connection.close()
+    return results
+
+
+def last_date():
+    connection = app.get_connection()
+    cursor = connection.cursor()
+    cursor.execute('SELECT MAX(d2) FROM pdf_text')
+    value = cursor.fetchone()[0]
+    cursor.close()
+    connection.close()
+    return value
+
+
+def explain(start, end):
+    connection = app.get_connection()
+    cursor = connection.cursor(dictionary=True)
+    chosen = app.choose_search_index(cursor, start)
+    for index in ('idx_pdf_text_d1_d2', 'idx_pdf_text_d2_d1'):
+        cursor.execute('EXPLAIN ' + app.SEARCH_QUERY.format(index=index, keyset=''), (end, start, app.SEARCH_PAGE_SIZE + 1))
+        for row in cursor.fetchall():
+            print(f'  {start} a {end}  {index}{" (escolhido)" if index == chosen else ""}: type {row["type"]}  '
+                  f'key {row["key"]}  rows {row["rows"]}  Extra {row["Extra"]}')
+    cursor.close()
+    connection.close()
+
+
+def measure(search, queries):
+    latencies = []
+    for start, end in queries:
+        started = time.perf_counter()
+        search(start, end)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Busca por intervalo antes e depois dos índices')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--text-bytes', type=int, default=1000)
+    args = parser.parse_args()
+
+    create_database(app)
+    app.init_schema()
+    seed(args.rows, args.text_bytes)
+    app.SEARCH_CACHE_SIZE = 0  # Mede a consulta no MySQL, não o cache da busca
+
+    drop_interval_indexes()
+    before = measure(legacy_search, ranges(args.queries))
+
+    app.init_schema()  # Recria os índices
+    after = measure(lambda start, end: app.search_reports(start, end), ranges(args.queries))
+
+    end_of_data = last_date()
+    recent_ordered = measure(ordered_search, recent_ranges(args.queries, end_of_data))
+    recent_chosen = measure(lambda start, end: app.search_reports(start, end), recent_ranges(args.queries, end_of_data))
+
+    print(f'linhas: {args.rows}  consultas: {args.queries}')
+    print(f'antes  (OR, sem índices, LONGTEXT, sem paginação): mediana {before[0]:8.1f} ms  p95 {before[1]:8.1f} ms')
+    print(f'depois (índices, colunas estreitas, 1ª página):     mediana {after[0]:8.1f} ms  p95 {after[1]:8.1f} ms')
+    print(f'intervalos recentes, sempre pelo (d1, d2):          mediana {recent_ordered[0]:8.1f} ms  p95 {recent_ordered[1]:8.1f} ms')
+    print(f'intervalos recentes, índice de choose_search_index: mediana {recent_chosen[0]:8.1f} ms  p95 {recent_chosen[1]:8.1f} ms')
+    print('EXPLAIN (1ª página):')
+    explain(date(2010, 1, 1), date(2010, 12, 31))
+    explain(end_of_data - timedelta(days=90), end_of_data - timedelta(days=60))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Benchmark: requisições/s da rota de busca com e sem o pool de conexões MySQL
+#
+# Requer um MySQL local (MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE).
+# Uso: MYSQL_HOST=127.0.0.1 python benchmarks/bench_search_pool.py [--requests 2000] [--concurrency 8]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.gettempdir())
+
+import app  # noqa: E402
+
+FORM = {'start_date': '2020-01-01', 'end_date': '2020-12-31'}
+
+
+def run(pool_size, requests, concurrency):
+    app.MYSQL_POOL_SIZE = pool_size
+    app.SEARCH_CACHE_SIZE = 0  # A mesma busca repetida seria respondida pelo cache, sem passar pelo pool
+    client = app.app.test_client()
+
+    def search(_):
+        response = client.post('/', data=FORM)
+        assert response.status_code == 200
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(search, range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Busca com e sem pool de conexões')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=8)
+    args = parser.parse_args()
+
+    app.init_schema()
+    without_pool = run(0, args.requests, args.concurrency)
+    with_pool = run(args.pool_size, args.requests, args.concurrency)
+
+    print(f'requisições: {args.requests}  concorrência: {args.concurrency}')
+    print(f'sem pool:            {without_pool:8.1f} req/s')
+    print(f'com pool ({args.pool_size:>2} conn): {with_pool:8.1f} req/s')
+    print(f'ganho:               {with_pool / without_pool:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# Teste de carga: buscas por data por segundo (e latência) enquanto uploads são enviados ao mesmo tempo
+#
+# Cliente HTTP simples em asyncio, sem dependências. Rode contra o servidor de desenvolvimento e contra o
+# gunicorn (mesmo banco, mesmos dados, cache da busca desligado) para comparar:
+#
+#   SEARCH_CACHE_SIZE=0 python app.py                                  # servidor de desenvolvimento
+#   SEARCH_CACHE_SIZE=0 gunicorn --config gunicorn.conf.py wsgi:app    # produção
+#   python benchmarks/bench_serving.py --url http://127.0.0.1:5000 [--requests 2000] [--concurrency 32] [--uploads 4]
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_pdf  # noqa: E402
+
+
+# Cada busca usa um intervalo diferente, para que as respostas venham do MySQL e não do cache da busca
+def search_form(rng):
+    start = date(2000, 1, 1) + timedelta(days=rng.randrange(0, 9000))
+    end = start + timedelta(days=rng.choice([30, 90, 365]))
+    return {'start_date': f'{start:%Y-%m-%d}', 'end_date': f'{end:%Y-%m-%d}'}
+
+
+async def post(url, body, content_type):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    head = (f'POST {parts.path or "/"} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n'
+            f'Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n')
+    writer.write(head.encode() + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()  # Lê a resposta inteira, como um navegador
+    writer.close()
+    await writer.wait_closed()
+    return int(status_line.split()[1])
+
+
+# Cada envio ganha um comentário diferente no fim do PDF, para que o hash mude e o cache de OCR não seja usado
+def multipart(pdf_bytes):
+    boundary = uuid.uuid4().hex
+    pdf_bytes += f'\n% {boundary}\n'.encode()
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="atestado-{boundary}.pdf"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n').encode() + pdf_bytes + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+async def searches(url, requests, concurrency):
+    rng = random.Random(7)
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for _ in remaining:
+            body = urlencode(search_form(rng)).encode()
+            started = time.perf_counter()
+            try:
+                status = await post(url, body, 'application/x-www-form-urlencoded')
+            except OSError:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            errors += status != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - started, sorted(latencies), errors
+
+
+async def uploads(url, pdf_bytes, count, stop):
+    sent = 0
+
+    async def client():
+        nonlocal sent
+        while not stop.is_set():
+            body, content_type = multipart(pdf_bytes)
+            try:
+                await post(url, body, content_type)
+            except OSError:
+                pass
+            sent += 1
+
+    await asyncio.gather(*(client() for _ in range(count)))
+    return sent
+
+
+async def run(args, pdf_bytes):
+    stop = asyncio.Event()
+    upload_task = asyncio.ensure_future(uploads(args.url, pdf_bytes, args.uploads, stop))
+    elapsed, latencies, errors = await searches(args.url, args.requests, args.concurrency)
+    stop.set()
+    sent = await upload_task
+
+    print(f'{args.url}  buscas: {args.requests}  concorrência: {args.concurrency}  uploads simultâneos: {args.uploads}')
+    print(f'buscas/s:  {args.requests / elapsed:8.1f}')
+    print(f'latência:  p50 {latencies[len(latencies) // 2] * 1000:7.1f} ms   '
+          f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.1f} ms   max {latencies[-1] * 1000:7.1f} ms')
+    print(f'erros:     {errors}')
+    print(f'uploads enviados durante o teste: {sent}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga da busca com uploads simultâneos')
+    parser.add_argument('--url', default='http://127.0.0.1:5000/')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--uploads', type=int, default=4, help='clientes enviando PDFs sem parar durante o teste')
+    parser.add_argument('--pages', type=int, default=20, help='páginas do PDF sintético enviado')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, 'atestado.pdf')
+        make_pdf(pdf_path, pages=args.pages)
+        with open(pdf_path, 'rb') as source:
+            pdf_bytes = source.read()
+
+    asyncio.run(run(args, pdf_bytes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Benchmark: latência (p50/p95) da busca textual FULLTEXT sobre 500 mil documentos
+#
+# Usa o banco atestados_bench_text_search (ver bench_database.py).
+# Uso: MYSQL_HOST=127.0.0.1 python benchmarks/bench_text_search.py [--docs 500000] [--queries 300]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.gettempdir())
+
+from bench_database import create_database, use_database  # noqa: E402
+
+use_database('atestados_bench_text_search')
+
+import app  # noqa: E402
+
+# Vocabulário com acentos para exercitar a normalização (as consultas são feitas sem acentos e vice-versa)
+VOCABULARY = (
+    'pavimentação drenagem edificação fiscalização concreto armado estrutura metálica instalações elétricas '
+    'hidráulicas terraplenagem contenção fundação estaca sondagem topografia iluminação pública saneamento '
+    'esgotamento sanitário reservatório adutora barragem ponte viaduto passarela recapeamento sinalização '
+    'urbanização paisagismo manutenção reforma ampliação construção escola hospital unidade básica saúde '
+    'ginásio quadra poliesportiva creche habitação conjunto habitacional galeria pluvial canal retificação'
+).split()
+
+QUERIES = [
+    'pavimentacao', 'drenagem pluvial', '"concreto armado"', 'ponte', 'hospital reforma',
+    'estrutura metalica', '"iluminação pública"', 'saneamento esgotamento', 'creche', 'barragem contencao',
+]
+
+
+def seed(docs, words, batch=2000):
+    connection = app.get_connection()
+    cursor = connection.cursor()
+    cursor.execute('SELECT COUNT(*) FROM pdf_search')
+    existing = cursor.fetchone()[0]
+    rng = random.Random(42)
+    for offset in range(existing, docs, batch):
+        numbers = range(offset, min(offset + batch, docs))
+        texts = [' '.join(rng.choice(VOCABULARY) for _ in range(words)) for _ in numbers]
+        # O texto completo fica só no índice de busca; pdf_text recebe apenas os metadados usados no resultado
+        cursor.executemany(
+            'INSERT INTO pdf_text (text_hash, pdf_name) VALUES (%s, %s)',
+            [(f'fts-{number:060x}', f'atestado-{number}.pdf') for number in numbers],
+        )
+        first_id = cursor.lastrowid
+        cursor.executemany(
+            'INSERT INTO pdf_search (pdf_id, content) VALUES (%s, %s)',
+            [(first_id + index, app.normalize_text(text)) for index, text in enumerate(texts)],
+        )
+        connection.commit()
+        print(f'\r{offset + len(numbers)} documentos', end='', file=sys.stderr)
+    print(file=sys.stderr)
+    # Consolida o índice FULLTEXT depois da carga em massa
+    cursor.execute('SET GLOBAL innodb_optimize_fulltext_only = ON')
+    cursor.execute('OPTIMIZE TABLE pdf_search')
+    cursor.fetchall()
+    cursor.execute('SET GLOBAL innodb_optimize_fulltext_only = OFF')
+    cursor.close()
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latência da busca textual')
+    parser.add_argument('--docs', type=int, default=500_000)
+    parser.add_argument('--words', type=int, default=300)
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+
+    create_database(app)
+    app.init_schema()
+    seed(args.docs, args.words)
+
+    latencies = []
+    for number in range(args.queries):
+        query = QUERIES[number % len(QUERIES)]
+        started = time.perf_counter()
+        app.search_text(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f'documentos: {args.docs}  consultas: {args.queries}')
+    print(f'p50: {p50:8.1f} ms  p95: {p95:8.1f} ms  (meta: p95 < 100 ms)')
+
+
+if __name__ == '__main__':
+    main()
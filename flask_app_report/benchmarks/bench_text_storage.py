@@ -0,0 +1,123 @@
+# Benchmark: tamanho em disco e latência de varredura com o texto na linha de pdf_text (layout anterior)
+# x texto compactado em pdf_text_body (layout atual). O layout atual também guarda em pdf_search uma cópia
+# normalizada e não compactada de cada texto, com o índice FULLTEXT, que entra no total do "depois".
+#
+# Usa o banco atestados_bench_text_storage (ver bench_database.py).
+# Uso: MYSQL_HOST=127.0.0.1 python benchmarks/bench_text_storage.py [--docs 100000] [--scans 20]
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.gettempdir())
+
+from bench_database import create_database, use_database  # noqa: E402
+
+use_database('atestados_bench_text_storage')
+
+import app  # noqa: E402
+from synthetic import WORDS  # noqa: E402
+
+LEGACY_TABLE = '''
+    CREATE TABLE IF NOT EXISTS legacy_pdf_text (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        text LONGTEXT,
+        text_hash VARCHAR(64) UNIQUE,
+        d1 DATE,
+        d2 DATE,
+        pdf_name VARCHAR(255),
+        INDEX idx_legacy_d1_d2 (d1, d2)
+    )
+'''
+
+SCAN_QUERY = '''
+    SELECT id, pdf_name FROM {table} FORCE INDEX (PRIMARY)
+    WHERE d1 <= %s AND d2 >= %s
+'''
+
+
+def seed(cursor, connection, docs, batch=1000):
+    cursor.execute('SELECT COUNT(*) FROM legacy_pdf_text')
+    existing = cursor.fetchone()[0]
+    rng = random.Random(42)
+    for offset in range(existing, docs, batch):
+        rows = []
+        for number in range(offset, min(offset + batch, docs)):
+            text = ' '.join(rng.choice(WORDS) for _ in range(rng.randrange(150, 1500)))  # ~1 a 12 KB de texto
+            d1 = date(2000, 1, 1) + timedelta(days=rng.randrange(0, 9000))
+            rows.append((text, f'storage-{number:056x}', d1, d1 + timedelta(days=rng.randrange(30, 1500)),
+                         f'atestado-{number}.pdf'))
+        cursor.executemany('INSERT INTO legacy_pdf_text (text, text_hash, d1, d2, pdf_name) VALUES (%s, %s, %s, %s, %s)', rows)
+        cursor.executemany('INSERT INTO pdf_text (text_hash, d1, d2, pdf_name) VALUES (%s, %s, %s, %s)',
+                           [row[1:] for row in rows])
+        first_id = cursor.lastrowid
+        cursor.executemany('INSERT INTO pdf_text_body (pdf_id, body) VALUES (%s, %s)',
+                           [(first_id + index, app.compress_text(row[0])) for index, row in enumerate(rows)])
+        cursor.executemany('INSERT INTO pdf_search (pdf_id, content) VALUES (%s, %s)',
+                           [(first_id + index, app.normalize_text(row[0])) for index, row in enumerate(rows)])
+        connection.commit()
+        print(f'\r{offset + len(rows)} documentos', end='', file=sys.stderr)
+    print(file=sys.stderr)
+
+
+def table_size(cursor, table):
+    cursor.execute(f'ANALYZE TABLE {table}')
+    cursor.fetchall()
+    cursor.execute('''
+        SELECT data_length, index_length FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    ''', (table,))
+    data, index = cursor.fetchone()
+    return data + index
+
+
+def scan_latency(cursor, table, scans):
+    latencies = []
+    rng = random.Random(7)
+    for _ in range(scans):
+        start = date(2000, 1, 1) + timedelta(days=rng.randrange(0, 9000))
+        started = time.perf_counter()
+        cursor.execute(SCAN_QUERY.format(table=table), (start + timedelta(days=90), start))
+        cursor.fetchall()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Armazenamento do texto: na linha x compactado em tabela separada')
+    parser.add_argument('--docs', type=int, default=100_000)
+    parser.add_argument('--scans', type=int, default=20)
+    args = parser.parse_args()
+
+    create_database(app)
+    app.init_schema()
+    connection = app.get_connection()
+    cursor = connection.cursor()
+    cursor.execute(LEGACY_TABLE)
+    seed(cursor, connection, args.docs)
+
+    mb = 1024 * 1024
+    legacy_size = table_size(cursor, 'legacy_pdf_text')
+    metadata_size = table_size(cursor, 'pdf_text')
+    body_size = table_size(cursor, 'pdf_text_body')
+    search_size = table_size(cursor, 'pdf_search')
+    legacy_scan = scan_latency(cursor, 'legacy_pdf_text', args.scans)
+    metadata_scan = scan_latency(cursor, 'pdf_text', args.scans)
+    cursor.close()
+    connection.close()
+
+    print(f'documentos: {args.docs}')
+    print(f'antes:  pdf_text com texto na linha           {legacy_size / mb:10.1f} MB   varredura {legacy_scan:8.1f} ms')
+    print(f'depois: pdf_text (metadados)                  {metadata_size / mb:10.1f} MB   varredura {metadata_scan:8.1f} ms')
+    print(f'        pdf_text_body (texto compactado)      {body_size / mb:10.1f} MB')
+    print(f'        pdf_search (texto + índice FULLTEXT)  {search_size / mb:10.1f} MB')
+    print(f'        total                                 {(metadata_size + body_size + search_size) / mb:10.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Geração de PDFs sintéticos usados pelos benchmarks
+import random
+from datetime import date, timedelta
+
+from PIL import Image, ImageDraw, ImageFont
+
+PAGE_SIZE = (1654, 2339)  # A4 em 200 DPI, a mesma resolução padrão usada pelo pdf2image
+
+WORDS = (
+    'atestado capacidade tecnica obra servico execucao contrato engenharia '
+    'pavimentacao drenagem edificacao fiscalizacao responsavel quantidade unidade '
+    'item medicao concreto armado estrutura metalica instalacoes eletricas'
+).split()
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 não aceita o tamanho da fonte padrão
+        return ImageFont.load_default()
+
+
+def random_interval(rng):
+    start = date(2010, 1, 1) + timedelta(days=rng.randrange(0, 5000))
+    end = start + timedelta(days=rng.randrange(30, 1500))
+    return start, end
+
+
+def page_image(rng, lines=40, header=None):
+    image = Image.new('L', PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    font = _font(36)
+    y = 120
+    if header:
+        for line in header:
+            draw.text((120, y), line, fill=0, font=font)
+            y += 60
+    for _ in range(lines):
+        draw.text((120, y), ' '.join(rng.choice(WORDS) for _ in range(9)), fill=0, font=font)
+        y += 52
+        if y > PAGE_SIZE[1] - 120:
+            break
+    return image
+
+
+# Gera um PDF de várias páginas com as datas do atestado na primeira página
+def make_pdf(path, pages=10, seed=0, interval=None):
+    rng = random.Random(seed)
+    start, end = interval or random_interval(rng)
+    header = [
+        'ATESTADO DE CAPACIDADE TECNICA',
+        f'Data de início: {start:%d/%m/%Y}',
+        f'Conclusão Efetiva: {end:%d/%m/%Y}',
+    ]
+    images = [page_image(rng, header=header if page == 0 else None) for page in range(pages)]
+    images[0].save(path, 'PDF', resolution=200.0, save_all=True, append_images=images[1:])
+    for image in images:
+        image.close()
+    return start, end
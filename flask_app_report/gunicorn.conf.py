@@ -0,0 +1,39 @@
+# Configuração do gunicorn (servidor de produção no lugar do servidor de desenvolvimento do Flask)
+#
+# Uso: gunicorn --config gunicorn.conf.py wsgi:app
+# As tabelas são criadas antes, com "flask --app app init-db" (Job flask-report-init-db do deployment).
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Processos e threads por processo: as buscas esperam principalmente pelo MySQL, então threads rendem bem.
+# Cada processo tem o seu pool de MYSQL_POOL_SIZE conexões, então threads acima disso esperam por uma conexão livre.
+# O padrão não usa os.cpu_count(), que dentro do pod devolve as CPUs do nó e não o limite do contêiner.
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# Tempo máximo (s) sem resposta de um worker antes de reiniciá-lo; o OCR roda na fila (worker.py),
+# então só o envio de arquivos grandes por conexões lentas precisa de folga
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+# Threads de OCR dentro de cada processo do gunicorn (INGEST_WORKER_THREADS, por processo).
+# Em produção o OCR roda no contêiner do worker.py e a web usa INGEST_WORKER_THREADS=0.
+def post_worker_init(worker):
+    import app
+
+    app.start_ingest_workers()
+
+
+# Com PROMETHEUS_MULTIPROC_DIR, descarta os gauges dos processos que terminaram
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,188 @@
+# Ingestão em massa de PDFs a partir de um diretório ou de um manifesto (um caminho por linha)
+#
+# 1. Calcula o SHA-256 de cada arquivo e descarta os repetidos e os já gravados (pdf_text.file_hash);
+# 2. Faz o OCR dos arquivos restantes em um pool de processos (um arquivo por processo);
+# 3. Grava os resultados em lotes, com inserções de várias linhas em uma transação por lote.
+#
+# Uso: python ingest.py DIRETORIO [--manifest lista.txt] [--workers N] [--batch-size 50] [--report relatorio.jsonl]
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+
+import mysql.connector
+
+import app
+
+
+# Função executada nos processos do pool: OCR e extração de datas de um arquivo
+def ingest_file(path, file_hash):
+    started = time.monotonic()
+    page_metrics = []
+    try:
+        text = app.process_pdf(path, workers=1, page_metrics=page_metrics)  # O paralelismo é por arquivo
+        d1, d2 = app.extract_dates_many([text])[0]
+        record = {
+            'text': text, 'text_hash': app.calculate_hash(text), 'd1': d1, 'd2': d2,
+            'pdf_name': os.path.basename(path), 'file_hash': file_hash,
+        }
+        error = None
+    except Exception as e:
+        record, error = None, f'{type(e).__name__}: {e}'
+    return {'path': path, 'record': record, 'error': error, 'pages': len(page_metrics),
+            'ocr_pages': sum(metric['source'] == 'ocr' for metric in page_metrics),
+            'seconds': round(time.monotonic() - started, 3)}
+
+
+# Executa ingest_file no pool com no máximo `limit` arquivos em andamento, devolvendo os resultados conforme terminam
+# (evita manter na memória o texto de todos os arquivos já processados)
+def run_pool(executor, tasks, limit):
+    pending = set()
+    for path, file_hash in tasks:
+        pending.add(executor.submit(ingest_file, path, file_hash))
+        if len(pending) >= limit:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
+    for future in as_completed(pending):
+        yield future.result()
+
+
+def collect_paths(directory, manifest):
+    paths = []
+    if manifest:
+        with open(manifest, encoding='utf-8') as lines:
+            paths.extend(line.strip() for line in lines if line.strip())
+    if directory:
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in sorted(files) if app.allowed_file(name))
+    return paths
+
+
+class Report:
+    def __init__(self, path, total):
+        self.output = open(path, 'w', encoding='utf-8') if path else None
+        self.total = total
+        self.counts = {}
+        self.files = self.pages = 0
+        self.started = self.last_print = time.monotonic()
+
+    def add(self, path, status, message=None, pages=0, seconds=None):
+        self.counts[status] = self.counts.get(status, 0) + 1
+        self.files += 1
+        self.pages += pages
+        if self.output:
+            self.output.write(json.dumps({'path': path, 'status': status, 'message': message,
+                                          'pages': pages, 'seconds': seconds}, ensure_ascii=False) + '\n')
+        if status == 'error':
+            print(f'Erro em {path}: {message}', file=sys.stderr)
+        if time.monotonic() - self.last_print >= 5:
+            self.print_progress()
+
+    def pages_per_minute(self):
+        elapsed = time.monotonic() - self.started
+        return self.pages / elapsed * 60 if elapsed else 0
+
+    def print_progress(self):
+        self.last_print = time.monotonic()
+        summary = ', '.join(f'{status}: {count}' for status, count in sorted(self.counts.items()))
+        print(f'{self.files}/{self.total} arquivos, {self.pages} páginas ({self.pages_per_minute():.0f} páginas/min) — {summary}',
+              file=sys.stderr)
+
+    def close(self):
+        self.print_progress()
+        if self.output:
+            self.output.close()
+
+
+def hash_file(path):
+    try:
+        return path, app.calculate_file_hash(path), None
+    except OSError as err:  # Caminho do manifesto inexistente ou sem permissão de leitura
+        return path, None, str(err)
+
+
+def flush(batch, report, dry_run):
+    if not batch:
+        return
+    records = [result['record'] for result in batch]
+    errors = {}
+    try:
+        inserted = set() if dry_run else app.save_many_to_mysql(records)  # Posições dos registros inseridos
+    except mysql.connector.Error as err:
+        # Um erro no lote (ex.: o mesmo texto gravado ao mesmo tempo pela aplicação) não pode perder os demais arquivos.
+        # Cada registro vai em um lote próprio, que separa duplicados (conjunto vazio) de falhas (exceção).
+        print(f"Erro no lote, gravando um a um: {err}", file=sys.stderr)
+        inserted = set()
+        for position, record in enumerate(records):
+            try:
+                if app.save_many_to_mysql([record]):
+                    inserted.add(position)
+            except mysql.connector.Error as record_err:
+                errors[position] = str(record_err)
+    for position, result in enumerate(batch):
+        status, message = ('inserted' if position in inserted else 'duplicate'), None
+        if dry_run:
+            status = 'processed'
+        elif position in errors:
+            status, message = 'error', errors[position]
+        report.add(result['path'], status, message, pages=result['pages'], seconds=result['seconds'])
+    batch.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingestão em massa de PDFs')
+    parser.add_argument('directory', nargs='?', help='diretório percorrido recursivamente em busca de PDFs')
+    parser.add_argument('--manifest', help='arquivo com um caminho de PDF por linha')
+    parser.add_argument('--workers', type=int, default=app.OCR_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=50, help='documentos gravados por transação')
+    parser.add_argument('--report', help='relatório por arquivo (JSON lines)')
+    parser.add_argument('--dry-run', action='store_true', help='faz o OCR sem consultar nem gravar no banco')
+    args = parser.parse_args()
+    if not args.directory and not args.manifest:
+        parser.error('informe um diretório e/ou --manifest')
+
+    paths = collect_paths(args.directory, args.manifest)
+    report = Report(args.report, len(paths))
+
+    # Hash dos bytes de cada arquivo (E/S em threads) e deduplicação antes de qualquer OCR
+    unique = {}
+    with ThreadPoolExecutor(max_workers=8) as hasher:
+        for path, file_hash, error in hasher.map(hash_file, paths):
+            if error:
+                report.add(path, 'error', error)
+            elif file_hash in unique:
+                report.add(path, 'duplicate_file', f'mesmo conteúdo de {unique[file_hash]}')
+            else:
+                unique[file_hash] = path
+    if not args.dry_run:
+        app.init_schema()
+        for file_hash in app.existing_file_hashes(unique):
+            report.add(unique.pop(file_hash), 'duplicate_file', 'arquivo já gravado no banco')
+    print(f'{len(unique)} arquivo(s) para processar com {args.workers} processo(s)', file=sys.stderr)
+
+    batch = []
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            tasks = ((path, file_hash) for file_hash, path in unique.items())
+            for result in run_pool(executor, tasks, args.workers * 2):
+                if result['error']:
+                    report.add(result['path'], 'error', result['error'], result['pages'], result['seconds'])
+                elif not result['record']['d1'] and not result['record']['d2']:
+                    # Mesmo comportamento do upload pela aplicação: documentos sem datas não são gravados
+                    report.add(result['path'], 'no_dates', 'não foi possível extrair datas', result['pages'], result['seconds'])
+                else:
+                    batch.append(result)
+                    if len(batch) >= args.batch_size:
+                        flush(batch, report, args.dry_run)
+            flush(batch, report, args.dry_run)
+    finally:
+        report.close()
+
+    if report.counts.get('error'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
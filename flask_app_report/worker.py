@@ -0,0 +1,38 @@
+# Worker de OCR executado fora do processo web (ex.: como sidecar no mesmo pod, compartilhando o volume de uploads)
+#
+# Uso: python worker.py [--threads N] [--init-db]
+import argparse
+import os
+import signal
+import threading
+
+from prometheus_client import multiprocess
+
+import app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Processa a fila de uploads (ingest_jobs)')
+    parser.add_argument('--threads', type=int, default=max(1, app.INGEST_WORKER_THREADS))
+    parser.add_argument('--init-db', action='store_true',
+                        help='cria/atualiza as tabelas antes de começar (no cluster isso é feito pelo Job de migração)')
+    args = parser.parse_args()
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    if args.init_db:
+        app.init_schema()
+    threads = app.start_ingest_workers(args.threads, stop_event)
+    print(f'Worker iniciado em {app.WORKER_HOST} com {len(threads)} thread(s)')
+    for thread in threads:
+        thread.join()
+
+    # Com PROMETHEUS_MULTIPROC_DIR compartilhado com a web, descarta os gauges deste processo
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+# Ponto de entrada WSGI para servidores de produção
+#
+# Uso: gunicorn --config gunicorn.conf.py wsgi:app
+from app import app  # noqa: F401